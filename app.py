@@ -1,11 +1,21 @@
 # app.py
 from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, jsonify
-from models import db, Dance, DanceType, DanceFormat, SetType
+from models import db, Dance, DanceType, DanceFormat, SetType, Formation, Figure, DanceFigure, dance_formation, ImportJob, ImportJobChunk
 from werkzeug.utils import secure_filename
 import os
 import psycopg2
 import requests
-from parsers import DancePageParser
+from parsers import DancePageParser, PARSER_VERSION, extract_dance_id_from_url, set_default_backend, set_verbose, is_verbose, set_partial_parsing
+from importer import ConcurrentImporter, rate_limiter
+from http_client import http_client
+from dance_store import LookupCache, DanceBatchWriter
+from image_downloader import ImageDownloader, image_downloader
+from file_import import iter_file_chunks, resolve_columns, map_row, count_rows
+from timing import ImportMetrics, stage, add_bytes
+from page_cache import PageCache
+from parse_cache import ParseCache
+from fulltext import setup_fulltext_index, fulltext_condition
+from import_jobs import ImportJobWorker, JobProgress, pause_requested
 from datetime import datetime
 from contextlib import contextmanager
 from sqlalchemy import and_, or_, inspect, text
@@ -14,9 +24,8 @@ import filetype
 import pandas as pd
 import chardet
 import json
-from bs4 import BeautifulSoup
-import time
 import re
+import hashlib
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -32,6 +41,55 @@ app.config['THUMBNAIL_SIZE'] = (300, 300)    # Размер превью
 # Конфигурация для массового импорта
 app.config['BATCH_IMPORT_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_imports')
 app.config['ALLOWED_BATCH_EXTENSIONS'] = {'csv', 'xlsx', 'xls'}
+app.config['FILE_IMPORT_CHUNK_SIZE'] = 1000  # Строк CSV/XLSX, читаемых и сохраняемых за один раз
+app.config['IMPORT_CHUNK_SIZE'] = 50  # ID в одной части диапазона (контрольная точка после каждой)
+app.config['IMPORT_DB_BATCH_SIZE'] = 50  # Танцев в одной транзакции при массовом сохранении
+app.config['IMAGE_DOWNLOAD_WORKERS'] = 4  # Параллельные загрузки изображений при массовом импорте
+# Фоновый обработчик заданий импорта запускается вместе с приложением;
+# скрипты, которые только импортируют app (migration.py, replay_import.py), его отключают
+app.config['IMPORT_WORKER_AUTOSTART'] = os.environ.get('IMPORT_WORKER_AUTOSTART', '1').lower() not in ('0', 'false', 'no')
+app.config['IMPORT_JOB_STALE_AFTER'] = 180  # Секунд без сохранения прогресса, после которых задание считается прерванным
+
+# Конфигурация HTTP-клиента для загрузки с my.strathspey.org
+app.config['HTTP_POOL_SIZE'] = 16          # Максимум keep-alive соединений к одному хосту
+app.config['HTTP_MAX_RETRIES'] = 3         # Повторы при таймаутах, 429 и 5xx
+app.config['HTTP_BACKOFF_FACTOR'] = 0.5    # Задержка повтора: factor * 2^попытка секунд
+app.config['HTTP_TIMEOUT'] = 30
+
+http_client.configure(
+    pool_size=app.config['HTTP_POOL_SIZE'],
+    max_retries=app.config['HTTP_MAX_RETRIES'],
+    backoff_factor=app.config['HTTP_BACKOFF_FACTOR'],
+    timeout=app.config['HTTP_TIMEOUT']
+)
+
+# Конфигурация локального кэша загруженных страниц
+app.config['PAGE_CACHE_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'page_cache')
+app.config['PAGE_CACHE_TTL'] = 7 * 24 * 3600             # Через сколько секунд страница считается устаревшей
+app.config['PAGE_CACHE_MAX_BYTES'] = 512 * 1024 * 1024   # Размер кэша на диске (сжатый)
+
+# Кэш результатов разбора страниц (по хешу содержимого и версии парсера)
+app.config['PARSE_CACHE_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parse_cache')
+
+# Журнал длительности этапов импорта (JSON Lines: строка на танец и итог задания)
+app.config['IMPORT_TIMINGS_LOG'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'import_timings.jsonl')
+
+# Построитель дерева для парсера страниц: 'auto' (lxml, если установлен), 'lxml' или 'html.parser'
+app.config['HTML_PARSER_BACKEND'] = os.environ.get('HTML_PARSER_BACKEND', 'auto')
+set_default_backend(app.config['HTML_PARSER_BACKEND'])
+# Подробный вывод хода разбора страниц (PARSER_VERBOSE=1 для отладки парсера)
+app.config['PARSER_VERBOSE'] = os.environ.get('PARSER_VERBOSE', '').lower() in ('1', 'true', 'yes')
+set_verbose(app.config['PARSER_VERBOSE'])
+# Частичный разбор: строятся только разделы страницы, из которых берутся данные танца
+app.config['HTML_PARTIAL_PARSE'] = os.environ.get('HTML_PARTIAL_PARSE', '').lower() in ('1', 'true', 'yes')
+set_partial_parsing(app.config['HTML_PARTIAL_PARSE'])
+
+page_cache = PageCache(
+    app.config['PAGE_CACHE_FOLDER'],
+    ttl=app.config['PAGE_CACHE_TTL'],
+    max_bytes=app.config['PAGE_CACHE_MAX_BYTES']
+)
+parse_cache = ParseCache(app.config['PARSE_CACHE_FOLDER'], PARSER_VERSION)
 
 # Конфигурация базы данных
 DB_CONFIG = {
@@ -86,7 +144,14 @@ def check_postgres_connection():
         return False
 
 def setup_database():
-    """Настройка подключения к базе данных"""
+    """Настройка подключения к базе данных (DATABASE_URL задает базу явно, например для тестов)"""
+    if os.environ.get('DATABASE_URL'):
+        db_name = 'postgresql' if os.environ['DATABASE_URL'].startswith('postgresql') else 'sqlite'
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+        app.config['DB_SCHEMA'] = DB_CONFIG[db_name]['schema']
+        print(f"🎯 Используется база из DATABASE_URL ({db_name})")
+        return db_name
+    
     print("🔗 Проверка подключения к PostgreSQL...")
     if check_postgres_connection():
         app.config['SQLALCHEMY_DATABASE_URI'] = DB_CONFIG['postgresql']['uri']
@@ -114,33 +179,24 @@ def get_extrainfo_data(dance_id):
     """
     Извлекает данные с вкладки #extrainfo для указанного танца
     
+    Используется только когда страница танца ещё не загружена: при импорте
+    текст #extrainfo берётся из уже распарсенной страницы
+    (DancePageParser.get_extrainfo_text), без повторного запроса.
+    
     Args:
         dance_id (int): ID танца на сайте my.strathspey.org
     
     Returns:
         str: Текст с вкладки #extrainfo или пустая строка при ошибке
     """
-    url = f"https://my.strathspey.org/dd/dance/{dance_id}/#extrainfo"
+    # Фрагмент #extrainfo на сервер не передаётся - это та же страница танца
+    url = f"https://my.strathspey.org/dd/dance/{dance_id}/"
     
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=30, headers=headers)
+        response = http_client.get(url)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Находим раздел extrainfo
-        extrainfo_section = soup.find('div', id='extrainfo')
-        
-        if not extrainfo_section:
-            return ""
-        
-        # Извлекаем текст из раздела, очищаем от лишних пробелов
-        extrainfo_text = extrainfo_section.get_text(separator='\n', strip=True)
-        
-        return extrainfo_text
+        return DancePageParser(response.content).get_extrainfo_text()
         
     except requests.RequestException as e:
         print(f"❌ Ошибка при получении данных для dance_id {dance_id}: {e}")
@@ -149,12 +205,84 @@ def get_extrainfo_data(dance_id):
         print(f"❌ Неожиданная ошибка для dance_id {dance_id}: {e}")
         return ""
 
-def parse_dance_with_extrainfo(dance_id):
+def fetch_page(url, use_cache=True):
+    """
+    Загрузка страницы с учетом локального кэша
+    
+    Свежая запись из кэша возвращается без обращения к сети. Если сеть
+    недоступна, используется устаревшая запись (работа офлайн).
+    
+    Returns:
+        dict: content (bytes), content_hash, etag, last_modified
+    """
+    with stage('fetch'):
+        if use_cache:
+            content = page_cache.get(url)
+            if content is not None:
+                return page_from_cache(url, content)
+        
+        try:
+            response = http_client.get(url)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            stale_content = page_cache.get(url, allow_stale=True) if use_cache else None
+            if stale_content is None:
+                raise
+            print(f"📦 Сеть недоступна ({e}), используем устаревшую копию {url}")
+            return page_from_cache(url, stale_content)
+        
+        return store_fetched_page(url, response)
+
+def page_from_cache(url, content):
+    """Страница из кэша вместе с сохраненными валидаторами"""
+    entry = page_cache.get_entry(url) or {}
+    return {
+        'content': content,
+        'content_hash': hashlib.sha256(content).hexdigest(),
+        'etag': entry.get('etag'),
+        'last_modified': entry.get('last_modified')
+    }
+
+def store_fetched_page(url, response):
+    """Сохранение ответа сервера в кэш страниц"""
+    page = {
+        'content': response.content,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+    add_bytes(len(page['content']))
+    page['content_hash'] = page_cache.put(url, page['content'], etag=page['etag'], last_modified=page['last_modified'])
+    return page
+
+def fetch_page_if_modified(url, etag=None, last_modified=None):
+    """
+    Условный GET по сохраненным валидаторам
+    
+    Returns:
+        dict: Страница как в fetch_page или None если сервер ответил 304 Not Modified
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    
+    with stage('fetch'):
+        response = http_client.get(url, headers=headers)
+    if response.status_code == 304:
+        page_cache.touch(url)
+        return None
+    
+    response.raise_for_status()
+    return store_fetched_page(url, response)
+
+def parse_dance_with_extrainfo(dance_id, use_cache=True):
     """
     Парсит основные данные танца и добавляет данные с #extrainfo в поле note
     
     Args:
         dance_id (int): ID танца на источнике
+        use_cache (bool): Брать страницу из локального кэша, если она там есть
     
     Returns:
         dict: Данные танца с extrainfo в поле note
@@ -162,37 +290,54 @@ def parse_dance_with_extrainfo(dance_id):
     try:
         # Загружаем основную страницу танца
         url = f'https://my.strathspey.org/dd/dance/{dance_id}/'
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, timeout=30, headers=headers)
-        response.raise_for_status()
+        page = fetch_page(url, use_cache=use_cache)
+        
+        return parse_dance_page(page, url)
         
+    except Exception as e:
+        print(f"❌ Ошибка парсинга танца {dance_id}: {e}")
+        return None
+
+def parse_dance_page(page, url):
+    """Разбор загруженной страницы танца: основные данные, #extrainfo и валидаторы источника"""
+    content_hash = page.get('content_hash')
+    
+    # Неизменившаяся страница не разбирается повторно
+    with stage('parse'):
+        dance_data = parse_cache.get(content_hash) if content_hash else None
+    
+    if dance_data is None:
         # Парсим основные данные
-        parser = DancePageParser(response.text)
-        dance_data = parser.parse_dance_data()
-        print("🔍 ДАННЫЕ ПЕРЕД СОХРАНЕНИЕМ В БАЗУ:")
-        print(f"   couples_count: {dance_data.get('couples_count')}")
-        print(f"   set_format: {dance_data.get('set_format')}")
-        print(f"   formation: {dance_data.get('formation')}")
+        with stage('parse'):
+            parser = DancePageParser(page['content'])
+            dance_data = parser.parse_dance_data()
 
         if not dance_data:
             return None
         
-        # Получаем данные с #extrainfo
-        extrainfo_data = get_extrainfo_data(dance_id)
+        if is_verbose():
+            print("🔍 ДАННЫЕ ПЕРЕД СОХРАНЕНИЕМ В БАЗУ:")
+            print(f"   couples_count: {dance_data.get('couples_count')}")
+            print(f"   set_format: {dance_data.get('set_format')}")
+            print(f"   formation: {dance_data.get('formation')}")
+        
+        # Берем #extrainfo из уже загруженной страницы (это тот же URL)
+        with stage('extrainfo'):
+            extrainfo_data = parser.get_extrainfo_text()
         
         # Сохраняем только данные из #extrainfo в поле note (без префикса)
         dance_data['note'] = extrainfo_data if extrainfo_data else ""
         
-        # Добавляем URL источника
-        dance_data['source_url'] = url
-        
-        return dance_data
-        
-    except Exception as e:
-        print(f"❌ Ошибка парсинга танца {dance_id}: {e}")
-        return None
+        if content_hash:
+            parse_cache.put(content_hash, dance_data)
+    
+    # Добавляем URL источника и валидаторы страницы для последующего обновления
+    dance_data['source_url'] = url
+    dance_data['source_etag'] = page['etag']
+    dance_data['source_last_modified'] = page['last_modified']
+    dance_data['source_hash'] = page['content_hash']
+    
+    return dance_data
 
 #######################################################
 # ФУНКЦИИ ДЛЯ ОЧИСТКИ ТЕКСТА ОПИСАНИЙ
@@ -237,145 +382,693 @@ def batch_import():
             start_id = int(request.form.get('start_id', 1))
             end_id = int(request.form.get('end_id', 100))
             delay = float(request.form.get('delay', 1.0))
+            max_workers = int(request.form.get('max_workers', 4))
             download_images = request.form.get('download_images') == 'on'
             skip_existing = request.form.get('skip_existing') == 'on'
+            use_cache = request.form.get('use_cache') == 'on'
             
             if start_id > end_id:
                 flash('Начальный ID не может быть больше конечного', 'danger')
                 return redirect(request.url)
             
-            if end_id - start_id > 1000:
-                flash('Диапазон слишком большой. Максимум 1000 танцев за один импорт.', 'warning')
-                return redirect(request.url)
-            
-            results = {
-                'total': 0,
-                'successful': 0,
-                'skipped': 0,
-                'errors': 0,
-                'details': []
-            }
-            
-            # Импорт по диапазону ID
-            for dance_id in range(start_id, end_id + 1):
-                try:
-                    # Создаем новую сессию для каждого танца чтобы избежать проблем с транзакциями
-                    from sqlalchemy import create_engine
-                    from sqlalchemy.orm import sessionmaker
-                    
-                    # Проверяем существование танца если включена опция пропуска
-                    if skip_existing:
-                        existing_dance = Dance.query.filter_by(
-                            source_url=f"https://my.strathspey.org/dd/dance/{dance_id}/"
-                        ).first()
-                        if existing_dance:
-                            results['skipped'] += 1
-                            results['details'].append({
-                                'id': dance_id,
-                                'status': 'Пропущен',
-                                'message': 'Танец уже существует в базе',
-                                'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                            })
-                            continue
-                    
-                    # Парсим данные танца с #extrainfo
-                    print(f"🔄 Обрабатывается ID {dance_id}")
-                    dance_data = parse_dance_with_extrainfo(dance_id)
-                    
-                    if not dance_data:
-                        results['errors'] += 1
-                        results['details'].append({
-                            'id': dance_id,
-                            'status': 'Ошибка',
-                            'message': 'Не удалось получить данные танца',
-                            'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                        })
-                        continue
-                    
-                    if not dance_data.get('name'):
-                        results['errors'] += 1
-                        results['details'].append({
-                            'id': dance_id,
-                            'status': 'Ошибка',
-                            'message': 'Танец не имеет названия',
-                            'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                        })
-                        continue
-                    
-                    # Сохраняем в базу в отдельной транзакции
-                    try:
-                        dance = save_dance_to_db(dance_data)
-                        
-                        # Загружаем изображения если выбрана опция
-                        downloaded_files = []
-                        if download_images and dance_data.get('images'):
-                            downloaded_files = download_dance_images(dance_data, dance.id, dance.name)
-                            if downloaded_files:
-                                update_dance_note_with_images(dance, downloaded_files)
-                        
-                        results['successful'] += 1
-                        results['details'].append({
-                            'id': dance_id,
-                            'status': 'Успешно',
-                            'message': f"Танец '{dance.name}' импортирован",
-                            'url': dance_data['source_url'],
-                            'images_count': len(downloaded_files),
-                            'extrainfo_length': len(dance_data.get('note', ''))
-                        })
-                        
-                        print(f"✅ Успешно импортирован ID {dance_id}: {dance.name}")
-                        
-                    except Exception as e:
-                        # Откатываем транзакцию для этого танца
-                        db.session.rollback()
-                        results['errors'] += 1
-                        results['details'].append({
-                            'id': dance_id,
-                            'status': 'Ошибка БД',
-                            'message': f'Ошибка сохранения: {str(e)}',
-                            'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                        })
-                        print(f"❌ Ошибка БД для ID {dance_id}: {e}")
-                    
-                except requests.RequestException as e:
-                    results['errors'] += 1
-                    results['details'].append({
-                        'id': dance_id,
-                        'status': 'Ошибка сети',
-                        'message': f'Ошибка сети: {str(e)}',
-                        'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                    })
-                    print(f"❌ Ошибка сети для ID {dance_id}: {e}")
-                    
-                except Exception as e:
-                    results['errors'] += 1
-                    results['details'].append({
-                        'id': dance_id,
-                        'status': 'Ошибка импорта',
-                        'message': f'Ошибка импорта: {str(e)}',
-                        'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
-                    })
-                    print(f"❌ Ошибка импорта для ID {dance_id}: {e}")
-                
-                finally:
-                    results['total'] += 1
-                    
-                    # Задержка между запросами
-                    if delay > 0 and dance_id < end_id:
-                        time.sleep(delay)
-            
-            # Показываем результаты
-            flash(f'Массовый импорт завершен. Успешно: {results["successful"]}, Пропущено: {results["skipped"]}, Ошибки: {results["errors"]}', 
-                  'success' if results['errors'] == 0 else 'warning')
+            # Ограничиваем число одновременных запросов
+            max_workers = min(max(max_workers, 1), 16)
+            
+            # Импорт выполняется фоновым обработчиком, запрос только ставит задание в очередь
+            job = ImportJob(
+                kind='range',
+                status='queued',
+                total=end_id - start_id + 1,
+                params=json.dumps({
+                    'start_id': start_id,
+                    'end_id': end_id,
+                    'delay': delay,
+                    'max_workers': max_workers,
+                    'download_images': download_images,
+                    'skip_existing': skip_existing,
+                    'use_cache': use_cache,
+                    'chunk_size': app.config['IMPORT_CHUNK_SIZE']
+                })
+            )
+            db.session.add(job)
+            db.session.commit()
+            import_worker.notify()
             
-            return render_template('batch_import.html', results=results)
+            flash(f'Задание импорта #{job.id} поставлено в очередь (ID {start_id}-{end_id})', 'info')
+            return redirect(url_for('batch_import_job', job_id=job.id))
             
         except Exception as e:
+            db.session.rollback()
             flash(f'Ошибка при запуске массового импорта: {str(e)}', 'danger')
             import traceback
             traceback.print_exc()
     
-    return render_template('batch_import.html')
+    import_worker.start()
+    recent_jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(10).all()
+    return render_template('batch_import.html', recent_jobs=recent_jobs, batch_files=get_batch_import_files())
+
+@app.route('/batch_import/jobs/<int:job_id>')
+def batch_import_job(job_id):
+    """Страница задания импорта: прогресс во время выполнения и результаты после"""
+    job = ImportJob.query.get_or_404(job_id)
+    import_worker.start()
+    
+    results = None if job.is_active else job.to_results()
+    return render_template('batch_import.html', job=job, results=results)
+
+@app.route('/batch_import/jobs/<int:job_id>/progress')
+def batch_import_job_progress(job_id):
+    """JSON с прогрессом задания импорта"""
+    job = ImportJob.query.get_or_404(job_id)
+    progress = job.to_progress()
+    progress['http'] = http_client.stats()
+    return jsonify(progress)
+
+@app.route('/batch_import/jobs/<int:job_id>/pause', methods=['POST'])
+def pause_import_job(job_id):
+    """Остановка задания после текущей части диапазона"""
+    job = ImportJob.query.get_or_404(job_id)
+    if job.status == 'queued':
+        job.status = 'paused'
+    elif job.status == 'running':
+        job.status = 'pausing'
+    else:
+        flash(f'Задание #{job.id} не выполняется', 'warning')
+        return redirect(url_for('batch_import_job', job_id=job.id))
+    
+    db.session.commit()
+    flash(f'Задание #{job.id} будет остановлено после текущей части диапазона', 'info')
+    return redirect(url_for('batch_import_job', job_id=job.id))
+
+@app.route('/batch_import/jobs/<int:job_id>/resume', methods=['POST'])
+def resume_import_job(job_id):
+    """Продолжение остановленного задания с контрольной точки"""
+    job = ImportJob.query.get_or_404(job_id)
+    if job.status not in ('paused', 'failed'):
+        flash(f'Задание #{job.id} не остановлено', 'warning')
+        return redirect(url_for('batch_import_job', job_id=job.id))
+    
+    job.status = 'queued'
+    job.error_message = None
+    db.session.commit()
+    import_worker.notify()
+    
+    flash(f'Задание #{job.id} продолжится с ID {(job.checkpoint_id or job.get_params().get("start_id", 0) - 1) + 1}', 'info')
+    return redirect(url_for('batch_import_job', job_id=job.id))
+
+def run_batch_import_job(job):
+    """
+    Выполнение задания импорта по диапазону ID (вызывается фоновым обработчиком)
+    
+    Диапазон делится на части по chunk_size ID, после каждой части в базе
+    сохраняется контрольная точка. Перезапущенное или возобновленное задание
+    продолжает с первой незавершенной части.
+    
+    Returns:
+        str: 'paused' если задание остановлено пользователем, иначе None
+    """
+    params = job.get_params()
+    start_id = params['start_id']
+    end_id = params['end_id']
+    delay = params.get('delay', 1.0)
+    download_images = params.get('download_images', False)
+    skip_existing = params.get('skip_existing', False)
+    use_cache = params.get('use_cache', True)
+    chunk_size = params.get('chunk_size', app.config['IMPORT_CHUNK_SIZE'])
+    
+    # Задержка - минимальный интервал между запросами к одному хосту,
+    # а не пауза после каждого танца
+    rate_limiter.configure(rate=1.0 / delay if delay > 0 else None)
+    
+    # Разбиваем диапазон на части при первом запуске
+    if not job.chunks:
+        for chunk_start in range(start_id, end_id + 1, chunk_size):
+            job.chunks.append(ImportJobChunk(start_id=chunk_start, end_id=min(chunk_start + chunk_size - 1, end_id)))
+        db.session.commit()
+    
+    progress = JobProgress(job)
+    progress.restore_checkpoint([chunk for chunk in job.chunks if chunk.status == 'done'])
+    
+    # Длительность этапов по каждому танцу (загрузка и парсинг - в потоках импортера)
+    metrics = ImportMetrics(app.config['IMPORT_TIMINGS_LOG'], job_id=job.id)
+    
+    def fetch_dance(dance_id):
+        with metrics.track(dance_id):
+            return parse_dance_with_extrainfo(dance_id, use_cache=use_cache)
+    
+    importer = ConcurrentImporter(fetch_dance, max_workers=params.get('max_workers', 4))
+    
+    # Справочники загружаются один раз на задание, танцы пишутся пачками
+    writer = DanceBatchWriter(apply_dance_data, batch_size=app.config['IMPORT_DB_BATCH_SIZE'])
+    
+    # ID уже импортированных танцев из диапазона - одним запросом по индексу source_id
+    existing_ids = load_existing_source_ids(start_id, end_id) if skip_existing else set()
+    
+    # Изображения загружаются в фоне параллельно с импортом следующих танцев
+    downloader = ImageDownloader(max_workers=app.config['IMAGE_DOWNLOAD_WORKERS']) if download_images else None
+    try:
+        return import_job_chunks(job, progress, importer, writer, downloader, existing_ids, metrics)
+    finally:
+        if downloader:
+            downloader.close()
+            print(f"🖼️  Изображения: {downloader.stats()}")
+        save_job_timings(job, metrics)
+
+def save_job_timings(job, metrics):
+    """Итоги по этапам импорта: в журнал и в задание (для страницы результатов)"""
+    metrics.flush()
+    metrics.write_summary()
+    try:
+        job.timings = json.dumps(metrics.summary())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Не удалось сохранить время этапов задания #{job.id}: {e}")
+    print(f"⏱️  Этапы импорта: {metrics.summary()}")
+
+def import_job_chunks(job, progress, importer, writer, downloader, existing_ids, metrics):
+    """Обработка незавершенных частей диапазона задания с контрольной точкой после каждой"""
+    results = progress.results
+    
+    for chunk in job.chunks:
+        if chunk.status == 'done':
+            continue
+        
+        if pause_requested(job):
+            progress.save(force=True)
+            print(f"⏸️  Задание #{job.id} остановлено на ID {job.checkpoint_id}")
+            return 'paused'
+        
+        counters_before = {key: results[key] for key in ('total', 'successful', 'skipped', 'errors')}
+        details_start = len(results['details'])
+        
+        # Проверяем существующие танцы заранее, чтобы не загружать их страницы
+        dance_ids = []
+        for dance_id in range(chunk.start_id, chunk.end_id + 1):
+            if dance_id in existing_ids:
+                results['total'] += 1
+                results['skipped'] += 1
+                results['details'].append({
+                    'id': dance_id,
+                    'status': 'Пропущен',
+                    'message': 'Танец уже существует в базе',
+                    'url': f'https://my.strathspey.org/dd/dance/{dance_id}/'
+                })
+                continue
+            dance_ids.append(dance_id)
+        
+        # Загрузка и парсинг идут параллельно, сохранение в базу - в этом потоке
+        for dance_id, dance_data, error in importer.run(dance_ids):
+            results['total'] += 1
+            import_fetched_dance(dance_id, dance_data, error, downloader, results, writer, existing_ids, metrics)
+            # Прогресс сохраняется только между пачками, чтобы не коммитить пачку частично
+            if not writer.pending:
+                apply_downloaded_images(downloader, metrics=metrics)
+                progress.save()
+        
+        writer.flush()
+        apply_downloaded_images(downloader, wait_all=True, metrics=metrics)
+        metrics.flush()
+        results['details'][details_start:] = sorted(results['details'][details_start:], key=lambda detail: detail['id'])
+        
+        # Контрольная точка: часть диапазона обработана полностью
+        chunk.status = 'done'
+        chunk.finished_at = datetime.utcnow()
+        chunk.processed = results['total'] - counters_before['total']
+        chunk.successful = results['successful'] - counters_before['successful']
+        chunk.skipped = results['skipped'] - counters_before['skipped']
+        chunk.errors = results['errors'] - counters_before['errors']
+        job.checkpoint_id = chunk.end_id
+        progress.save(force=True)
+    
+    print(f'✅ Массовый импорт завершен. Успешно: {results["successful"]}, Пропущено: {results["skipped"]}, Ошибки: {results["errors"]}')
+    print(f"🌐 HTTP: {http_client.stats()}")
+    print(f"📦 Кэш страниц: {page_cache.stats()}")
+    print(f"🧩 Кэш разбора: {parse_cache.stats()}")
+    print(f"💾 Запись в базу: {writer.stats}")
+
+def apply_downloaded_images(downloader, wait_all=False, metrics=None):
+    """Запись в заметки танцев результатов завершенных фоновых загрузок изображений"""
+    if not downloader:
+        return
+    
+    for (dance_id, detail), downloaded_files, elapsed in downloader.completed(wait_all=wait_all):
+        detail['images_count'] = len(downloaded_files)
+        if metrics:
+            metrics.record(detail['id'], 'images', elapsed)
+            metrics.add_bytes(detail['id'], sum(file_info['size'] for file_info in downloaded_files))
+        if downloaded_files:
+            dance = db.session.get(Dance, dance_id)
+            if dance:
+                update_dance_note_with_images(dance, downloaded_files)
+
+def load_existing_source_ids(start_id=None, end_id=None):
+    """Множество source_id уже импортированных танцев (опционально - только из диапазона)"""
+    query = db.session.query(Dance.source_id).filter(Dance.source_id.isnot(None))
+    if start_id is not None and end_id is not None:
+        query = query.filter(Dance.source_id.between(start_id, end_id))
+    return {source_id for source_id, in query}
+
+def import_fetched_dance(dance_id, dance_data, error, downloader, results, writer, existing_ids=None, metrics=None):
+    """
+    Передача загруженного танца в writer (DanceBatchWriter) и запись результата в results
+    
+    downloader - ImageDownloader для фоновой загрузки изображений (None - без изображений),
+    existing_ids - множество импортированных source_id, пополняется после сохранения,
+    metrics - ImportMetrics для учета времени сохранения
+    """
+    source_url = f'https://my.strathspey.org/dd/dance/{dance_id}/'
+    
+    if isinstance(error, requests.RequestException):
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка сети',
+            'message': f'Ошибка сети: {str(error)}',
+            'url': source_url
+        })
+        print(f"❌ Ошибка сети для ID {dance_id}: {error}")
+        return
+    
+    if error:
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка импорта',
+            'message': f'Ошибка импорта: {str(error)}',
+            'url': source_url
+        })
+        print(f"❌ Ошибка импорта для ID {dance_id}: {error}")
+        return
+    
+    if not dance_data:
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка',
+            'message': 'Не удалось получить данные танца',
+            'url': source_url
+        })
+        return
+    
+    if not dance_data.get('name'):
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка',
+            'message': 'Танец не имеет названия',
+            'url': source_url
+        })
+        return
+    
+    def on_saved(dance, save_error):
+        if metrics:
+            metrics.record(dance_id, 'save', writer.last_item_time)
+        
+        if save_error:
+            results['errors'] += 1
+            results['details'].append({
+                'id': dance_id,
+                'status': 'Ошибка БД',
+                'message': f'Ошибка сохранения: {str(save_error)}',
+                'url': source_url
+            })
+            print(f"❌ Ошибка БД для ID {dance_id}: {save_error}")
+            return
+        
+        detail = {
+            'id': dance_id,
+            'status': 'Успешно',
+            'message': f"Танец '{dance.name}' импортирован",
+            'url': dance_data['source_url'],
+            'images_count': 0,
+            'extrainfo_length': len(dance_data.get('note', ''))
+        }
+        results['successful'] += 1
+        results['details'].append(detail)
+        
+        # Загружаем изображения если выбрана опция (число файлов допишется в detail)
+        if downloader and dance_data.get('images'):
+            downloader.submit((dance.id, detail), dance_data['images'], ensure_dance_images_folder(dance.id, dance.name))
+        
+        if existing_ids is not None:
+            existing_ids.add(dance_id)
+        
+        print(f"✅ Успешно импортирован ID {dance_id}: {dance.name}")
+    
+    # Танец сохраняется вместе с пачкой, результат записывается после commit
+    writer.add(dance_data, on_saved)
+
+#######################################################
+# ОБНОВЛЕНИЕ ИМПОРТИРОВАННЫХ ТАНЦЕВ (УСЛОВНЫЕ ЗАПРОСЫ)
+#######################################################
+
+@app.route('/batch_import/refresh', methods=['POST'])
+def batch_refresh():
+    """Постановка в очередь обновления всех танцев, у которых есть source_url"""
+    try:
+        delay = float(request.form.get('delay', 1.0))
+        max_workers = min(max(int(request.form.get('max_workers', 4)), 1), 16)
+        
+        job = ImportJob(
+            kind='refresh',
+            status='queued',
+            total=Dance.query.filter(Dance.source_url.like('http%')).count(),
+            params=json.dumps({
+                'delay': delay,
+                'max_workers': max_workers
+            })
+        )
+        db.session.add(job)
+        db.session.commit()
+        import_worker.notify()
+        
+        flash(f'Задание обновления #{job.id} поставлено в очередь ({job.total} танцев)', 'info')
+        return redirect(url_for('batch_import_job', job_id=job.id))
+        
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Ошибка при запуске обновления: {str(e)}', 'danger')
+        return redirect(url_for('batch_import'))
+
+def refresh_dance_page(dance_ref):
+    """
+    Условная загрузка страницы танца (выполняется в пуле потоков)
+    
+    Returns:
+        dict: status - not_modified (304), unchanged (тот же хеш содержимого) или changed
+              (тогда в dance_data - новые распарсенные данные)
+    """
+    page = fetch_page_if_modified(dance_ref.source_url, dance_ref.source_etag, dance_ref.source_last_modified)
+    if page is None:
+        return {'status': 'not_modified'}
+    
+    # Сервер мог не поддерживать валидаторы - сравниваем содержимое
+    if dance_ref.source_hash and page['content_hash'] == dance_ref.source_hash:
+        return {'status': 'unchanged', 'page': page}
+    
+    return {'status': 'changed', 'page': page, 'dance_data': parse_dance_page(page, dance_ref.source_url)}
+
+def run_refresh_job(job):
+    """Обновление импортированных танцев: перепарсиваются только изменившиеся страницы"""
+    params = job.get_params()
+    delay = params.get('delay', 1.0)
+    rate_limiter.configure(rate=1.0 / delay if delay > 0 else None)
+    
+    # Обновление не делится на части: прерванное задание начинается заново
+    progress = JobProgress(job)
+    progress.restore_checkpoint([])
+    results = progress.results
+    
+    # В потоки передаем только значения строк, ORM-объекты привязаны к сессии этого потока
+    dance_refs = {
+        row.id: row for row in db.session.query(
+            Dance.id, Dance.source_url, Dance.source_etag, Dance.source_last_modified, Dance.source_hash
+        ).filter(Dance.source_url.like('http%')).order_by(Dance.id).all()
+    }
+    job.total = len(dance_refs)
+    progress.save(force=True)
+    
+    metrics = ImportMetrics(app.config['IMPORT_TIMINGS_LOG'], job_id=job.id)
+    lookups = LookupCache()
+    
+    def fetch_dance(dance_id):
+        with metrics.track(dance_id):
+            return refresh_dance_page(dance_refs[dance_id])
+    
+    importer = ConcurrentImporter(fetch_dance, max_workers=params.get('max_workers', 4))
+    for dance_id, outcome, error in importer.run(list(dance_refs)):
+        results['total'] += 1
+        with metrics.track(dance_id), stage('save'):
+            apply_refresh_result(dance_id, dance_refs[dance_id].source_url, outcome, error, results, lookups)
+        progress.save()
+    
+    results['details'].sort(key=lambda detail: detail['id'])
+    progress.save(force=True)
+    save_job_timings(job, metrics)
+    
+    print(f'✅ Обновление завершено. Обновлено: {results["successful"]}, Без изменений: {results["skipped"]}, Ошибки: {results["errors"]}')
+    print(f"🌐 HTTP: {http_client.stats()}")
+
+def apply_refresh_result(dance_id, source_url, outcome, error, results, lookups):
+    """Запись результата условной загрузки в базу и в results (lookups - LookupCache задания)"""
+    if error:
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка сети' if isinstance(error, requests.RequestException) else 'Ошибка',
+            'message': f'Ошибка обновления: {str(error)}',
+            'url': source_url
+        })
+        print(f"❌ Ошибка обновления танца {dance_id}: {error}")
+        return
+    
+    dance_data = outcome.get('dance_data')
+    if outcome['status'] == 'changed' and not (dance_data and dance_data.get('name')):
+        # Валидаторы и время проверки не обновляем: следующее обновление загрузит страницу заново
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка',
+            'message': 'Страница изменилась, но не удалось получить данные танца',
+            'url': source_url
+        })
+        print(f"❌ Не удалось разобрать изменившуюся страницу танца {dance_id}")
+        return
+    
+    try:
+        dance = db.session.get(Dance, dance_id)
+        if not dance:
+            return
+        
+        if outcome['status'] == 'changed':
+            # Сохраняем список загруженных изображений, добавленный к заметке при импорте
+            old_note = dance.note or ''
+            image_section_start = old_note.find('📷 Загружено изображений')
+            
+            apply_dance_data(dance, dance_data, lookups)
+            
+            if image_section_start >= 0:
+                image_section = old_note[image_section_start:]
+                dance.note = f"{dance.note}\n\n{image_section}" if dance.note else image_section
+            
+            results['successful'] += 1
+            results['details'].append({
+                'id': dance_id,
+                'status': 'Обновлен',
+                'message': f"Танец '{dance.name}' обновлен",
+                'url': source_url
+            })
+        else:
+            # 304 или то же содержимое - обновляем только валидаторы и время проверки
+            page = outcome.get('page')
+            if page:
+                dance.source_etag = page['etag'] or dance.source_etag
+                dance.source_last_modified = page['last_modified'] or dance.source_last_modified
+            dance.source_checked_at = datetime.utcnow()
+            
+            results['skipped'] += 1
+            results['details'].append({
+                'id': dance_id,
+                'status': 'Без изменений',
+                'message': 'Страница не изменилась' + (' (304)' if outcome['status'] == 'not_modified' else ''),
+                'url': source_url
+            })
+        
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        lookups.reset()
+        results['errors'] += 1
+        results['details'].append({
+            'id': dance_id,
+            'status': 'Ошибка БД',
+            'message': f'Ошибка сохранения: {str(e)}',
+            'url': source_url
+        })
+        print(f"❌ Ошибка БД при обновлении танца {dance_id}: {e}")
+
+#######################################################
+# ИМПОРТ КАТАЛОГА ИЗ CSV / XLSX
+#######################################################
+
+@app.route('/batch_import/file', methods=['POST'])
+def batch_import_file():
+    """Постановка в очередь импорта танцев из CSV/XLSX файла в BATCH_IMPORT_FOLDER"""
+    try:
+        upload = request.files.get('import_file')
+        
+        if upload and upload.filename:
+            if not allowed_batch_file(upload.filename):
+                flash('Недопустимый формат файла. Поддерживаются CSV, XLSX и XLS', 'danger')
+                return redirect(url_for('batch_import'))
+            
+            filename = secure_filename(upload.filename)
+            os.makedirs(app.config['BATCH_IMPORT_FOLDER'], exist_ok=True)
+            upload.save(os.path.join(app.config['BATCH_IMPORT_FOLDER'], filename))
+        else:
+            # Файл, уже лежащий в папке массового импорта
+            filename = secure_filename(request.form.get('existing_file', ''))
+        
+        file_path = os.path.join(app.config['BATCH_IMPORT_FOLDER'], filename)
+        if not filename or not allowed_batch_file(filename) or not os.path.isfile(file_path):
+            flash('Выберите CSV или XLSX файл для импорта', 'danger')
+            return redirect(url_for('batch_import'))
+        
+        job = ImportJob(
+            kind='file',
+            status='queued',
+            total=count_rows(file_path),
+            params=json.dumps({
+                'filename': filename,
+                'skip_existing': request.form.get('skip_existing') == 'on',
+                'chunk_size': app.config['FILE_IMPORT_CHUNK_SIZE']
+            })
+        )
+        db.session.add(job)
+        db.session.commit()
+        import_worker.notify()
+        
+        flash(f'Задание импорта #{job.id} из файла {filename} поставлено в очередь', 'info')
+        return redirect(url_for('batch_import_job', job_id=job.id))
+        
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Ошибка при запуске импорта из файла: {str(e)}', 'danger')
+        return redirect(url_for('batch_import'))
+
+def run_file_import_job(job):
+    """
+    Импорт танцев из CSV/XLSX частями по chunk_size строк
+    
+    Каждая часть сохраняется одной транзакцией, после нее в checkpoint_id
+    записывается число обработанных строк - прерванное задание продолжает с них.
+    """
+    params = job.get_params()
+    file_path = os.path.join(app.config['BATCH_IMPORT_FOLDER'], params['filename'])
+    chunk_size = params.get('chunk_size', app.config['FILE_IMPORT_CHUNK_SIZE'])
+    skip_existing = params.get('skip_existing', False)
+    
+    # Счетчики в базе сохраняются только вместе с контрольной точкой
+    progress = JobProgress(job)
+    
+    existing_ids = load_existing_source_ids() if skip_existing else set()
+    writer = DanceBatchWriter(apply_dance_data, batch_size=chunk_size)
+    # Длительность разбора строки и сохранения по каждой строке файла
+    metrics = ImportMetrics(app.config['IMPORT_TIMINGS_LOG'], job_id=job.id)
+    try:
+        return import_file_chunks(job, file_path, chunk_size, progress, writer, existing_ids, metrics)
+    finally:
+        save_job_timings(job, metrics)
+
+def import_file_chunks(job, file_path, chunk_size, progress, writer, existing_ids, metrics):
+    """Чтение файла частями с пропуском частей до контрольной точки"""
+    params = job.get_params()
+    results = progress.results
+    rows_done = job.checkpoint_id or 0
+    column_map = None
+    row_number = 0
+    
+    for headers, rows in iter_file_chunks(file_path, chunk_size):
+        if column_map is None:
+            column_map = resolve_columns(headers)
+            if 'name' not in column_map.values():
+                raise ValueError('В файле нет столбца с названием танца (name / название)')
+            print(f"📋 Столбцы файла {params['filename']}: {column_map}")
+        
+        # Части, импортированные до перезапуска
+        if row_number + len(rows) <= rows_done:
+            row_number += len(rows)
+            continue
+        
+        if pause_requested(job):
+            print(f"⏸️  Задание #{job.id} остановлено на строке {rows_done}")
+            return 'paused'
+        
+        for row in rows:
+            row_number += 1
+            if row_number <= rows_done:
+                continue
+            
+            results['total'] += 1
+            with metrics.track(row_number):
+                with stage('parse'):
+                    dance_data = map_row(row, column_map)
+                import_file_row(row_number, dance_data, results, writer, existing_ids, metrics)
+        
+        writer.flush()
+        metrics.flush()
+        rows_done = row_number
+        job.checkpoint_id = rows_done
+        progress.save(force=True)
+        print(f"📄 Импортировано строк: {rows_done}")
+    
+    print(f'✅ Импорт из файла завершен. Успешно: {results["successful"]}, Пропущено: {results["skipped"]}, Ошибки: {results["errors"]}')
+    print(f"💾 Запись в базу: {writer.stats}")
+
+def import_file_row(row_number, dance_data, results, writer, existing_ids, metrics=None):
+    """Передача строки файла в writer и запись результата в results (metrics - для учета времени сохранения)"""
+    source_url = dance_data.get('source_url', '')
+    
+    if not dance_data.get('name'):
+        results['errors'] += 1
+        results['details'].append({
+            'id': row_number,
+            'status': 'Ошибка',
+            'message': f'Строка {row_number}: нет названия танца',
+            'url': source_url
+        })
+        return
+    
+    source_id = safe_int(extract_dance_id_from_url(source_url))
+    if source_id is not None and source_id in existing_ids:
+        results['skipped'] += 1
+        results['details'].append({
+            'id': row_number,
+            'status': 'Пропущен',
+            'message': f"Танец '{dance_data['name']}' уже существует в базе",
+            'url': source_url
+        })
+        return
+    
+    def on_saved(dance, save_error):
+        if metrics:
+            metrics.record(row_number, 'save', writer.last_item_time)
+        
+        if save_error:
+            results['errors'] += 1
+            results['details'].append({
+                'id': row_number,
+                'status': 'Ошибка БД',
+                'message': f'Строка {row_number}: ошибка сохранения: {str(save_error)}',
+                'url': source_url
+            })
+            return
+        
+        results['successful'] += 1
+        results['details'].append({
+            'id': row_number,
+            'status': 'Успешно',
+            'message': f"Танец '{dance.name}' импортирован",
+            'url': source_url
+        })
+        if source_id is not None:
+            existing_ids.add(source_id)
+    
+    writer.add(dance_data, on_saved)
+
+def run_import_job(job):
+    """Выполнение задания импорта в зависимости от его вида"""
+    runners = {
+        'range': run_batch_import_job,
+        'refresh': run_refresh_job,
+        'file': run_file_import_job
+    }
+    return runners[job.kind](job)
+
+# Фоновый обработчик заданий массового импорта
+import_worker = ImportJobWorker(app, run_import_job, stale_after=app.config['IMPORT_JOB_STALE_AFTER'])
 
 #######################################################
 # ОДИНОЧНЫЙ ИМПОРТ С #EXTRAINFO
@@ -392,6 +1085,7 @@ def import_dance():
             download_images = request.form.get('download_images') == 'on'
             
             dance_id = None
+            metrics = ImportMetrics(app.config['IMPORT_TIMINGS_LOG'])
             
             if url:
                 # Извлекаем ID танца из URL
@@ -402,20 +1096,20 @@ def import_dance():
                     return render_template('import_dance.html')
                 
                 # Парсим данные с #extrainfo
-                dance_data = parse_dance_with_extrainfo(dance_id)
+                with metrics.track(dance_id):
+                    dance_data = parse_dance_with_extrainfo(dance_id)
             elif html_content:
                 # Парсим из HTML контента
-                parser = DancePageParser(html_content)
-                dance_data = parser.parse_dance_data()
+                with metrics.track('html'), stage('parse'):
+                    parser = DancePageParser(html_content)
+                    dance_data = parser.parse_dance_data()
                 
                 if dance_data:
-                    # Пытаемся получить ID из данных или устанавливаем заглушку
-                    dance_id = dance_data.get('source_id', 0)
-                    # Для HTML контента получаем #extrainfo отдельно если известен ID
-                    if dance_id and dance_id > 0:
-                        extrainfo_data = get_extrainfo_data(dance_id)
-                        if extrainfo_data:
-                            dance_data['note'] = f"Данные с вкладки #extrainfo:\n\n{extrainfo_data}"
+                    # Вкладка #extrainfo уже есть во вставленном HTML - повторно не загружаем
+                    with metrics.track('html'), stage('extrainfo'):
+                        extrainfo_data = parser.get_extrainfo_text()
+                    if extrainfo_data:
+                        dance_data['note'] = f"Данные с вкладки #extrainfo:\n\n{extrainfo_data}"
             else:
                 flash('Необходимо предоставить HTML контент или URL', 'danger')
                 return render_template('import_dance.html')
@@ -425,11 +1119,14 @@ def import_dance():
                 return render_template('import_dance.html')
             
             # Сохраняем в базу
-            dance = save_dance_to_db(dance_data)
+            with metrics.track(dance_id or 'html'), stage('save'):
+                dance = save_dance_to_db(dance_data)
             
             # Загружаем изображения если выбрана опция
             if download_images and dance_data.get('images'):
-                downloaded_files = download_dance_images(dance_data, dance.id, dance.name)
+                with metrics.track(dance_id or 'html'), stage('images'):
+                    downloaded_files = download_dance_images(dance_data, dance.id, dance.name)
+                    add_bytes(sum(file_info['size'] for file_info in downloaded_files))
                 
                 if downloaded_files:
                     update_dance_note_with_images(dance, downloaded_files)
@@ -437,6 +1134,9 @@ def import_dance():
                 else:
                     flash('Не удалось загрузить изображения', 'warning')
             
+            metrics.flush()
+            print(f"⏱️  Этапы импорта: {metrics.summary()}")
+            
             flash(f'Танец "{dance.name}" успешно импортирован с данными из #extrainfo!', 'success')
             return redirect(url_for('view_dance', dance_id=dance.id))
             
@@ -454,67 +1154,10 @@ def import_dance():
 def save_dance_to_db(dance_data):
     """Сохранение данных танца в базу с данными из #extrainfo в поле note"""
     try:
-        # Инициализируем переменные
-        dance_type_id = None
-        dance_format_id = None
-        set_type_id = None
-        
-        # Получаем или создаем тип танца
-        if dance_data.get('dance_type') and dance_data['dance_type'] != 'Unknown':
-            dance_type = DanceType.query.filter_by(name=dance_data['dance_type']).first()
-            if not dance_type:
-                dance_type = DanceType(
-                    name=dance_data['dance_type'], 
-                    code=dance_data['dance_type'][0] if dance_data['dance_type'] else 'U'
-                )
-                db.session.add(dance_type)
-                db.session.commit()
-            dance_type_id = dance_type.id
-        
-        # Получаем формат сета на основе set_format (общее количество пар)
-        if dance_data.get('set_format'):
-            format_name = f"{dance_data['set_format']} couples"
-            dance_format = DanceFormat.query.filter_by(name=format_name).first()
-            if not dance_format:
-                dance_format = DanceFormat(name=format_name)
-                db.session.add(dance_format)
-                db.session.commit()
-            dance_format_id = dance_format.id
-        
-        # Получаем тип сета
-        if dance_data.get('formation'):
-            set_type = SetType.query.filter_by(name=dance_data['formation']).first()
-            if not set_type:
-                set_type = SetType(name=dance_data['formation'])
-                db.session.add(set_type)
-                db.session.commit()
-            set_type_id = set_type.id
-        
-        # Используем данные из #extrainfo для поля note (уже очищенные)
-        note = dance_data.get('note', '')
-        
-        # Очищаем описания от лишних переносов
-        description = clean_cribs_text(dance_data.get('description'))
-        description2 = clean_cribs_text(dance_data.get('description2'))
-        
-        # Создаем танец
-        dance = Dance(
-            name=dance_data.get('name', 'Неизвестный танец'),
-            author=dance_data.get('author'),
-            dance_type_id=dance_type_id,
-            dance_format_id=dance_format_id,
-            set_type_id=set_type_id,
-            dance_couple=str(dance_data.get('couples_count')) if dance_data.get('couples_count') else None,
-            count_id=dance_data.get('repetitions'),
-            size_id=dance_data.get('bars_count'),
-            description=description,  # MiniCribs (очищенный)
-            description2=description2,  # E-cribs (очищенный)
-            rscds=False,      # Новое поле - по умолчанию False
-            published=', '.join(dance_data.get('published_in', [])) if dance_data.get('published_in') else None,
-            note=note,
-            source_url=dance_data.get('source_url', ''),
-        )
+        dance = Dance(rscds=False)  # rscds по умолчанию False
+        apply_dance_data(dance, dance_data)
         
+        # Новые записи справочников и танец сохраняются одним commit
         db.session.add(dance)
         db.session.commit()
         
@@ -524,6 +1167,97 @@ def save_dance_to_db(dance_data):
         db.session.rollback()
         raise e
 
+def save_dances_to_db(dances_data, batch_size=None):
+    """
+    Массовое сохранение распарсенных танцев
+    
+    Справочники загружаются в память один раз, танцы сохраняются
+    пачками по batch_size (по умолчанию IMPORT_DB_BATCH_SIZE) с одним commit на пачку.
+    
+    Returns:
+        tuple: (список сохраненных танцев, список пар (dance_data, ошибка))
+    """
+    saved = []
+    failed = []
+    
+    writer = DanceBatchWriter(apply_dance_data, batch_size=batch_size or app.config['IMPORT_DB_BATCH_SIZE'])
+    for dance_data in dances_data:
+        writer.add(
+            dance_data,
+            lambda dance, error, dance_data=dance_data: failed.append((dance_data, error)) if error else saved.append(dance)
+        )
+    writer.flush()
+    
+    return saved, failed
+
+def apply_dance_data(dance, dance_data, lookups=None):
+    """
+    Заполнение полей танца из распарсенных данных (для нового или обновляемого танца)
+    
+    lookups - LookupCache, общий для серии танцев; без него справочники
+    загружаются заново для одного танца.
+    """
+    lookups = lookups or LookupCache()
+    dance_type_id, dance_format_id, set_type_id = lookups.resolve(dance_data)
+    
+    # Используем данные из #extrainfo для поля note (уже очищенные)
+    note = dance_data.get('note', '')
+    
+    # Очищаем описания от лишних переносов
+    description = clean_cribs_text(dance_data.get('description'))
+    description2 = clean_cribs_text(dance_data.get('description2'))
+    
+    dance.name = dance_data.get('name', 'Неизвестный танец')
+    dance.author = dance_data.get('author')
+    dance.dance_type_id = dance_type_id
+    dance.dance_format_id = dance_format_id
+    dance.set_type_id = set_type_id
+    dance.dance_couple = str(dance_data.get('couples_count')) if dance_data.get('couples_count') else None
+    dance.count_id = dance_data.get('repetitions')
+    dance.size_id = dance_data.get('bars_count')
+    dance.description = description  # MiniCribs (очищенный)
+    dance.description2 = description2  # E-cribs (очищенный)
+    dance.published = ', '.join(dance_data.get('published_in', [])) if dance_data.get('published_in') else None
+    dance.note = note
+    dance.source_url = dance_data.get('source_url', '')
+    dance.source_etag = dance_data.get('source_etag')
+    dance.source_last_modified = dance_data.get('source_last_modified')
+    dance.source_hash = dance_data.get('source_hash')
+    dance.source_checked_at = datetime.utcnow()
+    apply_page_fields(dance, dance_data, lookups)
+
+def apply_page_fields(dance, dance_data, lookups=None):
+    """Данные страницы, которые нужны для фильтров и не требуют повторной загрузки"""
+    dance.meter = (dance_data.get('meter') or '')[:20] or None
+    dance.bars = (dance_data.get('bars') or '')[:10] or None
+    dance.progression = (dance_data.get('progression') or '')[:50] or None
+    dance.year = dance_data.get('year')
+    dance.intensity = parse_intensity_percent(dance_data.get('intensity'))
+    dance.steps = dump_json_list(dance_data.get('steps'))
+    dance.recommended_music = dump_json_list(dance_data.get('recommended_music'))
+    dance.figures = dump_json_list(dance_data.get('figures'))
+    dance.formations_list = dump_json_list(dance_data.get('formations_list'))
+    apply_formation_index(dance, dance_data.get('formations_list'), dance_data.get('figures'), lookups)
+
+def apply_formation_index(dance, formation_names, figures, lookups=None):
+    """Связи танца с формациями и фигуры по тактам (таблицы для поиска по индексу)"""
+    lookups = lookups or LookupCache()
+    dance.formations = lookups.formations(formation_names)
+    dance.figure_rows = [
+        DanceFigure(position=position, bars=(figure.get('bars') or '')[:20] or None,
+                    figure=lookups.figure(figure.get('description')))
+        for position, figure in enumerate(figures or [], start=1)
+    ]
+
+def parse_intensity_percent(intensity):
+    """Интенсивность в процентах из строки вида '55% (Medium)' (None если процентов нет)"""
+    match = re.search(r'(\d+)\s*%', str(intensity or ''))
+    return int(match.group(1)) if match else None
+
+def dump_json_list(values):
+    """Список для текстового JSON-столбца (None для пустого списка)"""
+    return json.dumps(values, ensure_ascii=False) if values else None
+
 #######################################################
 # РАСШИРЕННЫЙ ПОИСК С ПАГИНАЦИЕЙ
 #######################################################
@@ -544,6 +1278,8 @@ def render_search_results():
         'name': request.args.get('name', '').strip(),
         'author': request.args.get('author', '').strip(),
         'description_text': request.args.get('description_text', '').strip(),
+        'formation': request.args.get('formation', '').strip(),
+        'figure': request.args.get('figure', '').strip(),
         'size_min': request.args.get('size_min', '').strip(),
         'count_min': request.args.get('count_min', '').strip(),
         'dance_types': request.args.getlist('dance_types'),
@@ -583,15 +1319,30 @@ def render_search_results():
             if filters['author']:
                 query = query.filter(Dance.author.ilike(f'%{filters["author"]}%'))
             
-            # Поиск по тексту описания
+            # Поиск по тексту описания: полнотекстовый индекс, без него - ilike
             if filters['description_text']:
-                query = query.filter(
-                    or_(
+                condition = fulltext_condition(filters['description_text'])
+                if condition is None:
+                    condition = or_(
                         Dance.description.ilike(f'%{filters["description_text"]}%'),
                         Dance.description2.ilike(f'%{filters["description_text"]}%'),
                         Dance.note.ilike(f'%{filters["description_text"]}%')
                     )
-                )
+                query = query.filter(condition)
+            
+            # Танцы с формацией: имя ищется в справочнике, танцы - по индексу связи
+            if filters['formation']:
+                formation_ids = db.session.query(Formation.id).filter(Formation.name.ilike(f'%{filters["formation"]}%'))
+                query = query.filter(Dance.id.in_(
+                    db.session.query(dance_formation.c.dance_id).filter(dance_formation.c.formation_id.in_(formation_ids))
+                ))
+            
+            # Танцы с фигурой: текст ищется в справочнике фигур, танцы - по индексу figure_id
+            if filters['figure']:
+                figure_ids = db.session.query(Figure.id).filter(Figure.name.ilike(f'%{filters["figure"]}%'))
+                query = query.filter(Dance.id.in_(
+                    db.session.query(DanceFigure.dance_id).filter(DanceFigure.figure_id.in_(figure_ids))
+                ))
             
             # Применяем числовые фильтры - ИЗМЕНЕНО: точное совпадение вместо >=
             if filters['size_min']:
@@ -816,6 +1567,7 @@ def get_search_filters():
         'dance_types': DanceType.query.order_by(DanceType.name).all(),
         'dance_formats': DanceFormat.query.order_by(DanceFormat.name).all(),
         'set_types': SetType.query.order_by(SetType.name).all(),
+        'formations': Formation.query.order_by(Formation.name).all(),
         'dance_couples': [(c, c) for c in dance_couples]  # Преобразуем в формат для шаблона
     }
 
@@ -1257,6 +2009,11 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def allowed_batch_file(filename):
+    """Проверка расширения файла для импорта каталога"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_BATCH_EXTENSIONS']
+
 def allowed_image_file(filename):
     """Проверка разрешенных расширений для изображений"""
     return '.' in filename and \
@@ -1281,6 +2038,13 @@ def ensure_dance_images_folder(dance_id, dance_name):
     os.makedirs(images_path, exist_ok=True)
     return images_path
 
+def get_batch_import_files():
+    """CSV/XLSX файлы, лежащие в папке массового импорта"""
+    folder = app.config['BATCH_IMPORT_FOLDER']
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if allowed_batch_file(name))
+
 def get_dance_files(dance_id, dance_name):
     """Получение списка файлов для танца (кроме изображений)"""
     dance_path = get_dance_files_path(dance_id, dance_name)
@@ -1400,38 +2164,12 @@ def safe_int(value, default=None):
         return default
 
 def download_dance_images(dance_data, dance_id, dance_name):
-    """Загрузка изображений для танца"""
-    downloaded_files = []
-    
+    """Загрузка изображений для танца (файлы параллельно, потоково, без повторной загрузки)"""
     if not dance_data.get('images'):
-        return downloaded_files
+        return []
     
-    for image_info in dance_data['images']:
-        try:
-            image_url = image_info['url']
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(image_url, timeout=30, headers=headers)
-            response.raise_for_status()
-            
-            images_folder = ensure_dance_images_folder(dance_id, dance_name)
-            filename = secure_filename(os.path.basename(image_url))
-            file_path = os.path.join(images_folder, filename)
-            
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
-            
-            downloaded_files.append({
-                'filename': filename,
-                'url': image_url,
-                'type': image_info.get('type', 'diagram')
-            })
-            
-        except Exception as e:
-            print(f"❌ Ошибка загрузки изображения {image_url}: {e}")
-    
-    return downloaded_files
+    images_folder = ensure_dance_images_folder(dance_id, dance_name)
+    return image_downloader.download(dance_data['images'], images_folder)
 
 def update_dance_note_with_images(dance, downloaded_files):
     """Обновление заметки танца с информацией о загруженных изображениях"""
@@ -1854,7 +2592,8 @@ def check_tables_exist():
         inspector = inspect(db.engine)
         existing_tables = inspector.get_table_names()
         
-        required_tables = ['dance', 'dance_type', 'dance_format', 'set_type']
+        required_tables = ['dance', 'dance_type', 'dance_format', 'set_type', 'formation', 'dance_formation', 'figure', 'dance_figure',
+                           'import_job', 'import_job_chunk']
         
         # Для PostgreSQL проверяем таблицы в схеме
         if db_type == 'postgresql':
@@ -1905,6 +2644,7 @@ def init_database():
             print("🔄 Создание таблиц...")
             db.create_all()
             print("✅ Таблицы созданы")
+            setup_fulltext_index()
             
             # Добавляем базовые данные
             init_basic_data()
@@ -1957,6 +2697,11 @@ def init_basic_data():
 # ЗАПУСК ПРИЛОЖЕНИЯ
 #######################################################
 
+# При запуске через gunicorn / flask run обработчик стартует при импорте модуля,
+# когда все функции заданий уже определены; python app.py запускает его ниже
+if __name__ != '__main__' and app.config['IMPORT_WORKER_AUTOSTART']:
+    import_worker.start()
+
 if __name__ == '__main__':
     print("🚀 Запуск приложения...")
     print(f"📁 Папка для файлов: {app.config['UPLOAD_FOLDER']}")
@@ -1973,5 +2718,9 @@ if __name__ == '__main__':
     # Инициализация базы данных (только если нужно)
     init_database()
     
+    # Фоновый обработчик заданий импорта (при debug - только в дочернем процессе перезагрузчика)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and app.config['IMPORT_WORKER_AUTOSTART']:
+        import_worker.start()
+    
     print("🌐 Приложение запущено по адресу: http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,217 @@
+# parser_benchmark.py
+"""
+Замер скорости DancePageParser на сохраненных страницах из benchmarks/corpus
+
+Выводит страниц в секунду, время построения дерева и каждого извлекателя полей,
+пиковую память (tracemalloc) на разбор одной страницы.
+
+    python benchmarks/parser_benchmark.py
+    python benchmarks/parser_benchmark.py --repeat 50 --backend html.parser
+    python benchmarks/parser_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/parser_benchmark.py --compare benchmarks/baseline.json --threshold 10
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsers
+from parsers import DancePageParser
+
+CORPUS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Поле -> метод DancePageParser, который его извлекает (в порядке parse_dance_data)
+FIELD_EXTRACTORS = {
+    'main_info': '_parse_main_info_string',
+    'description': '_parse_description',
+    'name': '_parse_name',
+    'meter': '_parse_meter',
+    'bars': '_parse_bars',
+    'bars_count': '_parse_bars_count',
+    'progression': '_parse_progression',
+    'repetitions': '_parse_repetitions',
+    'author': '_parse_author',
+    'year': '_parse_year',
+    'steps': '_parse_steps',
+    'published_in': '_parse_publications',
+    'recommended_music': '_parse_music',
+    'figures': '_parse_figures',
+    'extra_info': '_parse_extra_info',
+    'intensity': '_parse_intensity',
+    'formations_list': '_parse_formations_list',
+    'images': '_parse_images',
+    'source_url': '_parse_source_url',
+    'note': 'get_extrainfo_text',
+}
+
+
+def load_corpus(folder):
+    """Страницы корпуса: имя файла -> содержимое"""
+    pages = {}
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith('.html'):
+            with open(os.path.join(folder, filename), encoding='utf-8') as f:
+                pages[filename] = f.read()
+    if not pages:
+        raise ValueError(f"В папке {folder} нет страниц .html")
+    return pages
+
+
+def _parser(html_content, options):
+    return DancePageParser(html_content, backend=options['backend'], partial=options['partial'])
+
+
+def measure_throughput(pages, repeat, options):
+    """Полный разбор (дерево + parse_dance_data) каждой страницы repeat раз"""
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        for html_content in pages.values():
+            _parser(html_content, options).parse_dance_data()
+    elapsed = time.perf_counter() - started_at
+    return len(pages) * repeat / elapsed
+
+
+def measure_fields(pages, repeat, options):
+    """
+    Среднее время на страницу (мс): построение дерева, индекс строк dt/dd
+    и каждый извлекатель полей по отдельности
+    """
+    totals = dict.fromkeys(['build', 'definitions'] + list(FIELD_EXTRACTORS), 0.0)
+
+    for _ in range(repeat):
+        for html_content in pages.values():
+            started_at = time.perf_counter()
+            parser = _parser(html_content, options)
+            totals['build'] += time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            parser._get_definitions()
+            totals['definitions'] += time.perf_counter() - started_at
+
+            for field, method in FIELD_EXTRACTORS.items():
+                started_at = time.perf_counter()
+                getattr(parser, method)()
+                totals[field] += time.perf_counter() - started_at
+
+    count = len(pages) * repeat
+    return {name: round(total / count * 1000, 4) for name, total in totals.items()}
+
+
+def measure_memory(pages, options):
+    """Пиковая память (КБ) на полный разбор каждой страницы"""
+    peaks = {}
+    for filename, html_content in pages.items():
+        tracemalloc.start()
+        try:
+            _parser(html_content, options).parse_dance_data()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks[filename] = round(peak / 1024, 1)
+    return peaks
+
+
+def run_benchmark(folder=CORPUS_FOLDER, repeat=20, backend=None, partial=False):
+    """
+    Returns:
+        dict: результаты замеров (формат файла базовой линии)
+    """
+    pages = load_corpus(folder)
+    options = {'backend': backend, 'partial': partial}
+    parsers.set_verbose(False)
+
+    # Прогрев: импорт построителей дерева, компиляция регулярных выражений
+    for html_content in pages.values():
+        _parser(html_content, options).parse_dance_data()
+
+    memory = measure_memory(pages, options)
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'backend': _parser(next(iter(pages.values())), options).backend,
+            'partial': partial,
+            'pages': len(pages),
+            'repeat': repeat,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'pages_per_sec': round(measure_throughput(pages, repeat, options), 2),
+        'field_ms': measure_fields(pages, repeat, options),
+        'peak_memory_kb': memory,
+        'max_peak_memory_kb': max(memory.values()),
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Сравнение с базовой линией
+
+    Returns:
+        list: строки отчета о метриках, ухудшившихся больше чем на threshold процентов
+    """
+    regressions = []
+
+    def check(name, old, new, higher_is_better=False):
+        if not old:
+            return
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        mark = '❌' if worse > threshold else ('✅' if worse < -threshold else '  ')
+        line = f"{mark} {name:<24} {old:>12} -> {new:>12} ({change:+.1f}%)"
+        print(line)
+        if worse > threshold:
+            regressions.append(line)
+
+    check('pages_per_sec', baseline['pages_per_sec'], current['pages_per_sec'], higher_is_better=True)
+    check('max_peak_memory_kb', baseline['max_peak_memory_kb'], current['max_peak_memory_kb'])
+    for field, value in current['field_ms'].items():
+        if field in baseline['field_ms']:
+            check(f"{field} (ms)", baseline['field_ms'][field], value)
+    return regressions
+
+
+def print_results(results):
+    environment = results['environment']
+    print(f"📊 Корпус: {environment['pages']} стр. × {environment['repeat']}, "
+          f"построитель: {environment['backend']}, частичный разбор: {environment['partial']}")
+    print(f"⚡ Страниц в секунду: {results['pages_per_sec']}")
+    print("⏱️  Время на страницу, мс:")
+    for field, value in sorted(results['field_ms'].items(), key=lambda item: -item[1]):
+        print(f"   {field:<20} {value:>10}")
+    print("💾 Пиковая память на разбор, КБ:")
+    for filename, value in results['peak_memory_kb'].items():
+        print(f"   {filename:<28} {value:>10}")
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Замер скорости парсера страниц танцев')
+    arg_parser.add_argument('--corpus', default=CORPUS_FOLDER, help='папка с сохраненными страницами .html')
+    arg_parser.add_argument('--repeat', type=int, default=20, help='повторов разбора каждой страницы')
+    arg_parser.add_argument('--backend', default=None, choices=parsers.PARSER_BACKENDS, help='построитель дерева')
+    arg_parser.add_argument('--partial', action='store_true', help='частичный разбор (только нужные разделы)')
+    arg_parser.add_argument('--save-baseline', metavar='PATH', help='сохранить результаты как базовую линию')
+    arg_parser.add_argument('--compare', metavar='PATH', help='сравнить с сохраненной базовой линией')
+    arg_parser.add_argument('--threshold', type=float, default=10.0, help='допустимое ухудшение, %%')
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.corpus, repeat=args.repeat, backend=args.backend, partial=args.partial)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✅ Базовая линия сохранена: {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"🔍 Сравнение с {args.compare} ({baseline['environment']['created_at']}):")
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f"❌ Ухудшение больше {args.threshold}%: {len(regressions)}")
+            sys.exit(1)
+        print("✅ Ухудшений нет")
@@ -0,0 +1,162 @@
+# dance_store.py
+import time
+from models import db, Dance, DanceType, DanceFormat, SetType, Formation, Figure
+
+
+class LookupCache:
+    """
+    Соответствие имя -> id для справочников (типы танцев, форматы и типы сетов)
+
+    Каждый справочник загружается одним запросом при первом обращении.
+    Недостающие записи создаются через flush без отдельного commit -
+    они попадают в базу вместе с танцем, которому понадобились.
+    """
+
+    def __init__(self):
+        self.maps = {}
+        self.instances = {}
+
+    def reset(self):
+        """Сброс после rollback: созданные в откаченной транзакции id больше не существуют"""
+        self.maps = {}
+        self.instances = {}
+
+    def _get_map(self, model):
+        if model not in self.maps:
+            self.maps[model] = {name: id for id, name in db.session.query(model.id, model.name)}
+        return self.maps[model]
+
+    def get_id(self, model, name, **defaults):
+        """id записи справочника по имени (создается, если ее нет)"""
+        names = self._get_map(model)
+        if name not in names:
+            instance = model(name=name, **defaults)
+            db.session.add(instance)
+            db.session.flush()
+            names[name] = instance.id
+        return names[name]
+
+    def get_instance(self, model, name):
+        """Запись справочника по имени для связей многие-ко-многим (создается, если ее нет)"""
+        if model not in self.instances:
+            self.instances[model] = {instance.name: instance for instance in model.query.all()}
+        instances = self.instances[model]
+        if name not in instances:
+            instance = model(name=name)
+            db.session.add(instance)
+            db.session.flush()
+            instances[name] = instance
+        return instances[name]
+
+    def formations(self, names):
+        """Формации по списку имен (без повторов, в исходном порядке)"""
+        result = []
+        for name in names or []:
+            name = name.strip()[:255]
+            if name and all(formation.name != name for formation in result):
+                result.append(self.get_instance(Formation, name))
+        return result
+
+    def figure(self, description):
+        """Фигура справочника по тексту фигуры (пробелы нормализуются) или None для пустого текста"""
+        name = ' '.join((description or '').split())[:255]
+        return self.get_instance(Figure, name) if name else None
+
+    def resolve(self, dance_data):
+        """id типа танца, формата сета и типа сета для распарсенного танца"""
+        dance_type_id = None
+        dance_format_id = None
+        set_type_id = None
+
+        if dance_data.get('dance_type') and dance_data['dance_type'] != 'Unknown':
+            dance_type_id = self.get_id(DanceType, dance_data['dance_type'], code=dance_data['dance_type'][0])
+
+        # Формат сета определяется по set_format (общее количество пар)
+        if dance_data.get('set_format'):
+            dance_format_id = self.get_id(DanceFormat, f"{dance_data['set_format']} couples")
+
+        if dance_data.get('formation'):
+            set_type_id = self.get_id(SetType, dance_data['formation'])
+
+        return dance_type_id, dance_format_id, set_type_id
+
+
+class DanceBatchWriter:
+    """
+    Сохранение новых танцев пачками: один commit на batch_size танцев
+
+    apply_func(dance, dance_data, lookups) заполняет поля танца.
+    on_saved(dance, error) вызывается для каждого танца после commit его пачки.
+    Если commit пачки не удался, танцы пачки сохраняются по одному,
+    чтобы ошибка одной записи не теряла остальные.
+    """
+
+    def __init__(self, apply_func, batch_size=50, lookups=None):
+        self.apply_func = apply_func
+        self.batch_size = max(1, batch_size)
+        self.lookups = lookups or LookupCache()
+        self.pending = []
+        self.stats = {'dances': 0, 'commits': 0, 'fallbacks': 0, 'db_time': 0.0}
+        self.last_item_time = 0.0  # Время сохранения в пересчете на танец последней пачки
+
+    def add(self, dance_data, on_saved=None):
+        """Добавление танца в текущую пачку (commit при заполнении пачки)"""
+        self.pending.append((dance_data, on_saved))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _build(self, dance_data):
+        dance = Dance(rscds=False)  # rscds по умолчанию False
+        self.apply_func(dance, dance_data, self.lookups)
+        db.session.add(dance)
+        return dance
+
+    def _commit(self):
+        # Объекты не сбрасываются после commit, чтобы обработчики
+        # не перечитывали каждый танец отдельным запросом
+        session = db.session()
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            session.commit()
+        finally:
+            session.expire_on_commit = expire_on_commit
+        self.stats['commits'] += 1
+
+    def flush(self):
+        """Запись накопленной пачки в базу"""
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        started_at = time.perf_counter()
+        outcomes = []
+
+        try:
+            dances = [self._build(dance_data) for dance_data, _ in batch]
+            self._commit()
+            outcomes = [(on_saved, dance, None) for (_, on_saved), dance in zip(batch, dances)]
+        except Exception as e:
+            db.session.rollback()
+            self.lookups.reset()
+            self.stats['fallbacks'] += 1
+            print(f"⚠️  Ошибка сохранения пачки из {len(batch)} танцев, сохраняем по одному: {e}")
+
+            for dance_data, on_saved in batch:
+                try:
+                    dance = self._build(dance_data)
+                    self._commit()
+                    outcomes.append((on_saved, dance, None))
+                except Exception as item_error:
+                    db.session.rollback()
+                    self.lookups.reset()
+                    outcomes.append((on_saved, None, item_error))
+
+        elapsed = time.perf_counter() - started_at
+        self.stats['dances'] += len(batch)
+        self.stats['db_time'] += elapsed
+        self.last_item_time = elapsed / len(batch)
+
+        for on_saved, dance, error in outcomes:
+            if on_saved:
+                on_saved(dance, error)
@@ -0,0 +1,199 @@
+# file_import.py
+import csv
+import os
+import chardet
+import pandas as pd
+
+# Столбцы таблицы -> поля распарсенного танца (как у DancePageParser).
+# Заголовки сравниваются без учета регистра и пробелов по краям.
+COLUMN_ALIASES = {
+    'name': ['name', 'title', 'dance', 'название', 'танец'],
+    'author': ['author', 'devisor', 'автор'],
+    'dance_type': ['type', 'dance_type', 'тип', 'тип танца'],
+    'set_format': ['set_format', 'format', 'формат', 'формат сета'],
+    'formation': ['formation', 'set_type', 'set', 'тип сета'],
+    'couples_count': ['couples', 'couples_count', 'пары', 'количество пар'],
+    'repetitions': ['repetitions', 'count', 'повторения'],
+    'bars_count': ['bars', 'bars_count', 'такты', 'количество тактов'],
+    'description': ['description', 'cribs', 'minicribs', 'описание'],
+    'description2': ['description2', 'e-cribs', 'ecribs', 'описание 2'],
+    'published_in': ['published', 'published_in', 'source', 'опубликован', 'публикация'],
+    'note': ['note', 'notes', 'заметка', 'примечание'],
+    'source_url': ['source_url', 'url', 'ссылка'],
+    'meter': ['meter', 'time signature', 'музыкальный размер'],
+    'year': ['year', 'год'],
+    'progression': ['progression', 'прогрессия'],
+}
+
+# Поля, которые приводятся к целым числам
+INTEGER_FIELDS = {'set_format', 'couples_count', 'repetitions', 'bars_count', 'year'}
+
+# Разделители, которые ищет csv.Sniffer
+CSV_DELIMITERS = ',;\t|'
+
+SAMPLE_SIZE = 64 * 1024
+
+
+def _read_sample(file_path, sample_size=SAMPLE_SIZE):
+    with open(file_path, 'rb') as f:
+        return f.read(sample_size)
+
+
+def detect_encoding(file_path, sample_size=SAMPLE_SIZE):
+    """Кодировка текстового файла по первым sample_size байтам (chardet)"""
+    return _sample_encoding(_read_sample(file_path, sample_size))
+
+
+def _sample_encoding(sample):
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+
+    detected = chardet.detect(sample)
+    encoding = detected.get('encoding') or 'utf-8'
+    # ascii-образец может оказаться началом utf-8 файла
+    return 'utf-8' if encoding.lower() == 'ascii' else encoding
+
+
+def sniff_csv_format(file_path, sample_size=SAMPLE_SIZE):
+    """
+    Кодировка и разделитель CSV по одному образцу из начала файла
+
+    Returns:
+        tuple: (кодировка, разделитель); если разделитель не определен - запятая
+    """
+    sample = _read_sample(file_path, sample_size)
+    encoding = _sample_encoding(sample)
+
+    text = sample.decode(encoding, errors='ignore')
+    if len(sample) == sample_size and '\n' in text:
+        # Последняя строка образца может быть обрезана
+        text = text[:text.rfind('\n')]
+
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter
+
+
+def resolve_columns(headers):
+    """Соответствие заголовок файла -> поле танца (неизвестные столбцы пропускаются)"""
+    aliases = {
+        alias: field
+        for field, field_aliases in COLUMN_ALIASES.items()
+        for alias in field_aliases
+    }
+
+    column_map = {}
+    for header in headers:
+        field = aliases.get(str(header).strip().lower()) if header is not None else None
+        if field and field not in column_map.values():
+            column_map[header] = field
+    return column_map
+
+
+def _clean_value(value):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer():
+            value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def map_row(row, column_map):
+    """Строка файла (dict заголовок -> значение) в словарь данных танца"""
+    dance_data = {}
+    for header, field in column_map.items():
+        value = _clean_value(row.get(header))
+        if value is None:
+            continue
+
+        if field in INTEGER_FIELDS:
+            try:
+                value = int(float(value))
+            except ValueError:
+                continue
+        elif field == 'published_in':
+            value = [part.strip() for part in value.split(',') if part.strip()]
+
+        dance_data[field] = value
+    return dance_data
+
+
+def count_rows(file_path):
+    """Приблизительное число строк данных (для индикатора прогресса)"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        with open(file_path, 'rb') as f:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1024 * 1024), b''))
+        return max(0, lines - 1)
+
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(0, (max_row or 1) - 1)
+
+    return None
+
+
+def iter_file_chunks(file_path, chunk_size=1000):
+    """
+    Чтение CSV/XLSX частями по chunk_size строк
+
+    CSV читается pandas с chunksize (разделитель определяется csv.Sniffer по образцу),
+    XLSX - openpyxl в режиме read_only, поэтому в памяти одновременно только одна часть.
+    Старые .xls читаются целиком (xlrd не поддерживает потоковое чтение).
+
+    Yields:
+        tuple: (заголовки, список строк как dict заголовок -> значение)
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == '.csv':
+        encoding, delimiter = sniff_csv_format(file_path)
+        reader = pd.read_csv(
+            file_path,
+            encoding=encoding,
+            sep=delimiter,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunk_size
+        )
+        with reader:
+            for frame in reader:
+                yield list(frame.columns), frame.to_dict('records')
+
+    elif extension == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = list(next(rows, []))
+            chunk = []
+            for values in rows:
+                if not any(value is not None for value in values):
+                    continue
+                chunk.append(dict(zip(headers, values)))
+                if len(chunk) >= chunk_size:
+                    yield headers, chunk
+                    chunk = []
+            if chunk:
+                yield headers, chunk
+        finally:
+            workbook.close()
+
+    elif extension == '.xls':
+        frame = pd.read_excel(file_path, dtype=str, keep_default_na=False)
+        for start in range(0, len(frame), chunk_size):
+            yield list(frame.columns), frame.iloc[start:start + chunk_size].to_dict('records')
+
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {extension}")
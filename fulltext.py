@@ -0,0 +1,152 @@
+# fulltext.py
+"""
+Полнотекстовый индекс по описаниям танцев (description, description2) и заметке (note)
+
+PostgreSQL: столбец dance.search_vector (tsvector) с GIN-индексом, заполняется триггером.
+SQLite: таблица FTS5 dance_fts над таблицей dance, синхронизируется триггерами.
+Если индекса нет (база не обновлена или SQLite без FTS5), поиск идет через ilike.
+"""
+import re
+from sqlalchemy import inspect
+from models import db, Dance
+
+TEXT_COLUMNS = ['description', 'description2', 'note']
+
+# Есть ли индекс в текущей базе (None - еще не проверялось)
+_available = None
+
+
+def _qualified(name):
+    schema = Dance.__table__.schema
+    return f"{schema}.{name}" if schema else name
+
+
+def _postgresql_statements(create_column):
+    table = _qualified('dance')
+    document = " || ' ' || ".join(f"coalesce(NEW.{column}, '')" for column in TEXT_COLUMNS)
+    statements = [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        f"CREATE INDEX IF NOT EXISTS ix_dance_search_vector ON {table} USING GIN (search_vector)",
+        f"""CREATE OR REPLACE FUNCTION {_qualified('dance_search_vector_update')}() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := to_tsvector('simple', {document});
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql""",
+        f"DROP TRIGGER IF EXISTS dance_search_vector_trigger ON {table}",
+        f"""CREATE TRIGGER dance_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {', '.join(TEXT_COLUMNS)} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {_qualified('dance_search_vector_update')}()""",
+    ]
+    if create_column:
+        # Танцы, сохраненные до появления индекса
+        existing = " || ' ' || ".join(f"coalesce({column}, '')" for column in TEXT_COLUMNS)
+        statements.append(f"UPDATE {table} SET search_vector = to_tsvector('simple', {existing})")
+    return statements
+
+
+def _sqlite_statements(create_table):
+    columns = ', '.join(TEXT_COLUMNS)
+    new_values = ', '.join(f"new.{column}" for column in TEXT_COLUMNS)
+    old_values = ', '.join(f"old.{column}" for column in TEXT_COLUMNS)
+    # Триггеры создаются в схеме таблицы и обращаются к таблицам без схемы
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {_qualified('dance_fts')} USING fts5(
+            {columns}, content='dance', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {_qualified('dance_fts_insert')} AFTER INSERT ON dance BEGIN
+            INSERT INTO dance_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {_qualified('dance_fts_delete')} AFTER DELETE ON dance BEGIN
+            INSERT INTO dance_fts (dance_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {_qualified('dance_fts_update')} AFTER UPDATE OF {columns} ON dance BEGIN
+            INSERT INTO dance_fts (dance_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO dance_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+    ]
+    if create_table:
+        # Танцы, сохраненные до появления индекса
+        statements.append(f"INSERT INTO {_qualified('dance_fts')} (dance_fts) VALUES ('rebuild')")
+    return statements
+
+
+def _index_exists(conn):
+    inspector = inspect(conn)
+    schema = Dance.__table__.schema
+    if conn.dialect.name == 'postgresql':
+        return any(column['name'] == 'search_vector' for column in inspector.get_columns('dance', schema=schema))
+    if conn.dialect.name == 'sqlite':
+        return 'dance_fts' in inspector.get_table_names(schema=schema)
+    return False
+
+
+def setup_fulltext_index():
+    """
+    Создание индекса и триггеров синхронизации (повторный вызов ничего не меняет)
+
+    Returns:
+        bool: индекс доступен
+    """
+    global _available
+    try:
+        with db.engine.begin() as conn:
+            exists = _index_exists(conn)
+            if conn.dialect.name == 'postgresql':
+                statements = _postgresql_statements(create_column=not exists)
+            elif conn.dialect.name == 'sqlite':
+                statements = _sqlite_statements(create_table=not exists)
+            else:
+                statements = []
+
+            for statement in statements:
+                conn.execute(db.text(statement))
+
+        _available = bool(statements)
+        if _available:
+            print(f"✅ Полнотекстовый индекс {'создан' if not exists else 'проверен'} ({db.engine.dialect.name})")
+    except Exception as e:
+        _available = False
+        print(f"⚠️  Полнотекстовый индекс недоступен, поиск по описанию через ilike: {e}")
+    return _available
+
+
+def fulltext_available():
+    global _available
+    if _available is None:
+        try:
+            with db.engine.connect() as conn:
+                _available = _index_exists(conn)
+        except Exception:
+            _available = False
+    return _available
+
+
+def search_terms(text):
+    """Слова поискового запроса (операторы синтаксиса запросов отбрасываются)"""
+    return re.findall(r'\w+', text or '')
+
+
+def fulltext_condition(text):
+    """
+    Условие для Dance.query: все слова запроса (как начала слов) встречаются
+    в description, description2 или note
+
+    Returns:
+        условие SQLAlchemy или None, если индекса нет или в запросе нет слов
+    """
+    terms = search_terms(text)
+    if not terms or not fulltext_available():
+        return None
+
+    if db.engine.dialect.name == 'postgresql':
+        tsquery = ' & '.join(f"{term.lower()}:*" for term in terms)
+        return db.literal_column(f"{Dance.__table__.fullname}.search_vector").op('@@')(
+            db.func.to_tsquery('simple', tsquery)
+        )
+
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return Dance.id.in_(
+        db.text(f"SELECT rowid FROM {_qualified('dance_fts')} WHERE dance_fts MATCH :match")
+        .bindparams(match=match)
+        .columns(db.column('rowid', db.Integer))
+    )
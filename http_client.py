@@ -0,0 +1,204 @@
+# http_client.py
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from importer import rate_limiter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Ответы, после которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ConnectionCountingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter, считающий настоящие TCP-подключения
+
+    urllib3 переиспользует объект соединения и после того, как сервер закрыл сокет
+    (HTTP/1.0, истекший keep-alive) - тогда объект подключается заново.
+    Поэтому считаются вызовы connect(), а не созданные объекты соединений.
+    """
+
+    def __init__(self, **kwargs):
+        self.connects = 0
+        self.connects_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: self._counting_pool_class(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def _counting_pool_class(self, pool_class):
+        adapter = self
+
+        class CountingConnection(pool_class.ConnectionCls):
+            def connect(self):
+                with adapter.connects_lock:
+                    adapter.connects += 1
+                return super().connect()
+
+        return type(pool_class.__name__, (pool_class,), {'ConnectionCls': CountingConnection})
+
+    def pool_requests(self):
+        """Запросов, отправленных через пулы адаптера"""
+        pools = self.poolmanager.pools
+        total = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_requests
+        return total
+
+
+class HttpClient:
+    """Общий HTTP-клиент: keep-alive пул соединений на хост, повторы с экспоненциальной задержкой"""
+
+    def __init__(self, pool_size=16, max_retries=3, backoff_factor=0.5, max_backoff=60, timeout=30, limiter=None):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.limiter = limiter
+        self.sessions = {}
+        self.counters = {'requests': 0, 'retries': 0, 'failures': 0}
+        self.lock = threading.Lock()
+
+    def configure(self, pool_size=None, max_retries=None, backoff_factor=None, max_backoff=None, timeout=None):
+        """Изменение настроек; сессии пересоздаются при следующем запросе"""
+        with self.lock:
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if max_retries is not None:
+                self.max_retries = max_retries
+            if backoff_factor is not None:
+                self.backoff_factor = backoff_factor
+            if max_backoff is not None:
+                self.max_backoff = max_backoff
+            if timeout is not None:
+                self.timeout = timeout
+            self._close_sessions()
+
+    def close(self):
+        """Закрытие всех соединений"""
+        with self.lock:
+            self._close_sessions()
+
+    def _close_sessions(self):
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+
+    def _get_session(self, url):
+        """Сессия с собственным пулом соединений для хоста из url"""
+        parsed = urlparse(url)
+        host_key = f"{parsed.scheme}://{parsed.netloc}"
+
+        with self.lock:
+            session = self.sessions.get(host_key)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                # Повторы делаем сами (с учетом Retry-After), urllib3 - без повторов;
+                # pool_block ограничивает число соединений к хосту размером пула
+                adapter = ConnectionCountingAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                                    max_retries=0, pool_block=True)
+                session.mount(host_key, adapter)
+                self.sessions[host_key] = session
+            return session
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _backoff_delay(self, attempt):
+        return min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+
+    def _retry_after_delay(self, response):
+        """Задержка из заголовка Retry-After (секунды или HTTP-дата)"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return min(self.max_backoff, int(value))
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return min(self.max_backoff, max(0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+
+    def get(self, url, headers=None, timeout=None, stream=False, **kwargs):
+        """
+        GET-запрос через пул соединений хоста
+
+        Повторяет запрос при таймаутах, ошибках соединения и ответах 429/5xx.
+        Последний неудачный ответ возвращается как есть (raise_for_status - на вызывающей стороне),
+        исключение последней попытки пробрасывается.
+        """
+        session = self._get_session(url)
+
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.wait(url)
+
+            self._count('requests')
+            try:
+                response = session.get(url, headers=headers, timeout=timeout or self.timeout,
+                                       stream=stream, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"⚠️  {e.__class__.__name__} для {url}, повтор через {delay:.1f} с")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._count('failures')
+                    return response
+
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                print(f"⚠️  HTTP {response.status_code} для {url}, повтор через {delay:.1f} с")
+                response.close()
+
+            self._count('retries')
+            time.sleep(delay)
+
+    def stats(self):
+        """Счетчики запросов и соединений (новых и переиспользованных keep-alive)"""
+        with self.lock:
+            stats = dict(self.counters)
+            sessions = list(self.sessions.values())
+
+        new_connections = 0
+        pool_requests = 0
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                if isinstance(adapter, ConnectionCountingAdapter):
+                    new_connections += adapter.connects
+                    pool_requests += adapter.pool_requests()
+
+        stats['new_connections'] = new_connections
+        stats['reused_connections'] = max(0, pool_requests - new_connections)
+        stats['hosts'] = len(sessions)
+        return stats
+
+
+# Общий клиент для всех исходящих запросов к источникам
+http_client = HttpClient(limiter=rate_limiter)
@@ -0,0 +1,174 @@
+# image_downloader.py
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from werkzeug.utils import secure_filename
+from http_client import http_client
+
+
+def file_sha256(file_path, chunk_size=64 * 1024):
+    """SHA-256 файла, прочитанного по частям"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ImageDownloader:
+    """
+    Параллельная потоковая загрузка изображений танцев
+
+    Тело ответа пишется на диск частями во временный файл и переименовывается
+    атомарно. Файл не загружается повторно, если в папке уже есть файл
+    с тем же именем и тем же размером (Content-Length) или тем же SHA-256.
+    """
+
+    def __init__(self, max_workers=4, chunk_size=64 * 1024, client=None):
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.client = client or http_client
+        self.executor = None
+        self.dispatch_executor = None
+        self.futures = {}
+        self.counters = {'downloaded': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-download')
+        return self.executor
+
+    def download_file(self, url, file_path):
+        """
+        Загрузка одного файла
+
+        Returns:
+            bool: True если файл записан, False если такой файл уже был на диске
+        """
+        response = self.client.get(url, stream=True)
+        try:
+            response.raise_for_status()
+
+            expected_size = response.headers.get('Content-Length')
+            if (expected_size and expected_size.isdigit() and os.path.exists(file_path)
+                    and os.path.getsize(file_path) == int(expected_size)):
+                return False
+
+            tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+            sha = hashlib.sha256()
+            size = 0
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        sha.update(chunk)
+                        size += len(chunk)
+
+                if os.path.exists(file_path) and file_sha256(file_path, self.chunk_size) == sha.hexdigest():
+                    os.remove(tmp_path)
+                    return False
+
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._count('bytes', size)
+            return True
+        finally:
+            response.close()
+
+    def download(self, images, folder):
+        """
+        Загрузка списка изображений одного танца в folder (параллельно)
+
+        Returns:
+            list: словари filename/url/type/size для файлов, которые есть в папке после загрузки
+                  (size - число загруженных байт, 0 если файл уже был)
+        """
+        futures = {}
+        for image_info in images:
+            filename = secure_filename(os.path.basename(image_info['url']))
+            if not filename:
+                continue
+            file_path = os.path.join(folder, filename)
+            future = self._get_executor().submit(self.download_file, image_info['url'], file_path)
+            futures[future] = (image_info, filename, file_path)
+
+        downloaded_files = []
+        for future, (image_info, filename, file_path) in futures.items():
+            try:
+                written = future.result()
+            except Exception as e:
+                self._count('failed')
+                print(f"❌ Ошибка загрузки изображения {image_info['url']}: {e}")
+                continue
+
+            self._count('downloaded' if written else 'skipped')
+            downloaded_files.append({
+                'filename': filename,
+                'url': image_info['url'],
+                'type': image_info.get('type', 'diagram'),
+                'size': os.path.getsize(file_path) if written else 0  # загружено байт
+            })
+
+        return downloaded_files
+
+    def submit(self, key, images, folder):
+        """Фоновая загрузка изображений танца; результат забирается через completed()"""
+        # Танцы обрабатываются в отдельном пуле, их файлы - в общем пуле загрузки
+        if self.dispatch_executor is None:
+            self.dispatch_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='image-dance')
+        future = self.dispatch_executor.submit(self._timed_download, images, folder)
+        self.futures[future] = key
+        return future
+
+    def _timed_download(self, images, folder):
+        started_at = time.perf_counter()
+        downloaded_files = self.download(images, folder)
+        return downloaded_files, time.perf_counter() - started_at
+
+    def completed(self, wait_all=False):
+        """
+        Завершенные фоновые загрузки
+
+        Yields:
+            tuple: (key, список загруженных файлов, длительность загрузки в секундах)
+        """
+        if not self.futures:
+            return
+
+        if wait_all:
+            done = list(self.futures)
+            wait(done)
+        else:
+            done = [future for future in self.futures if future.done()]
+
+        for future in done:
+            key = self.futures.pop(future)
+            downloaded_files, elapsed = future.result()
+            yield key, downloaded_files, elapsed
+
+    def close(self):
+        """Ожидание фоновых загрузок и остановка потоков"""
+        for executor in (self.dispatch_executor, self.executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self.executor = None
+        self.dispatch_executor = None
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+# Общий загрузчик для одиночного импорта
+image_downloader = ImageDownloader()
@@ -0,0 +1,187 @@
+# import_jobs.py
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from models import db, ImportJob
+
+
+class JobProgress:
+    """Накопление результатов задания с периодическим сохранением в базу"""
+
+    def __init__(self, job, save_interval=1.0, max_details=2000):
+        self.job = job
+        self.save_interval = save_interval
+        self.max_details = max_details
+        self.saved_at = 0
+        self.results = job.to_results()
+
+    def restore_checkpoint(self, done_chunks):
+        """
+        Возврат счетчиков к последней контрольной точке
+
+        Танцы из незавершенной части диапазона будут обработаны заново,
+        поэтому их результаты, успевшие попасть в базу, отбрасываются.
+        """
+        self.results['total'] = sum(chunk.processed or 0 for chunk in done_chunks)
+        self.results['successful'] = sum(chunk.successful or 0 for chunk in done_chunks)
+        self.results['skipped'] = sum(chunk.skipped or 0 for chunk in done_chunks)
+        self.results['errors'] = sum(chunk.errors or 0 for chunk in done_chunks)
+
+        checkpoint_id = self.job.checkpoint_id
+        self.results['details'] = [
+            detail for detail in self.results['details']
+            if checkpoint_id is not None and detail['id'] <= checkpoint_id
+        ]
+
+    def save(self, force=False):
+        """Запись счетчиков и деталей в таблицу заданий (не чаще save_interval)"""
+        now = time.monotonic()
+        if not force and now - self.saved_at < self.save_interval:
+            return
+
+        # Для очень длинных диапазонов храним только последние результаты
+        if len(self.results['details']) > self.max_details:
+            del self.results['details'][:-self.max_details]
+
+        self.job.processed = self.results['total']
+        self.job.successful = self.results['successful']
+        self.job.skipped = self.results['skipped']
+        self.job.errors = self.results['errors']
+        self.job.details = json.dumps(self.results['details'], ensure_ascii=False)
+        self.job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+        self.saved_at = now
+
+
+class ImportJobWorker:
+    """
+    Фоновый поток, выполняющий задания импорта из таблицы import_job по очереди
+
+    Обработчиков может быть несколько (процессы gunicorn): задание забирает тот,
+    кто первым перевел его в running, и записывает себя в claimed_by. Владелец
+    обновляет heartbeat_at при каждом сохранении прогресса; задание, у которого
+    отметка старше stale_after секунд, считается прерванным и возвращается в очередь.
+    """
+
+    def __init__(self, app, runner, poll_interval=5.0, stale_after=180):
+        self.app = app
+        self.runner = runner
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Запуск потока (повторные вызовы ничего не делают)"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, name='import-job-worker', daemon=True)
+            self.thread.start()
+            print("🧵 Запущен фоновый обработчик заданий импорта")
+
+    @property
+    def worker_id(self):
+        """Имя обработчика в claimed_by (вычисляется в процессе, где работает поток)"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def notify(self):
+        """Разбудить поток после добавления нового задания"""
+        self.start()
+        self.wakeup.set()
+
+    def _loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self._requeue_interrupted_jobs()
+                    while self._run_next_job():
+                        pass
+            except Exception as e:
+                print(f"❌ Ошибка обработчика заданий импорта: {e}")
+                traceback.print_exc()
+
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def _requeue_interrupted_jobs(self):
+        """
+        Задания, прерванные остановкой процесса, продолжаются с контрольной точки
+
+        Прерванными считаются задания без свежего heartbeat_at и задания этого же
+        процесса (поток вызывает проверку только между заданиями). Задания, которые
+        выполняют другие живые обработчики, не трогаются.
+        """
+        interrupted = or_(
+            ImportJob.heartbeat_at.is_(None),
+            ImportJob.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.stale_after),
+            ImportJob.claimed_by == self.worker_id
+        )
+        try:
+            requeued = ImportJob.query.filter(ImportJob.status == 'running', interrupted).update(
+                {'status': 'queued'}, synchronize_session=False
+            )
+            ImportJob.query.filter(ImportJob.status == 'pausing', interrupted).update(
+                {'status': 'paused'}, synchronize_session=False
+            )
+            db.session.commit()
+            if requeued:
+                print(f"🔁 Возобновлено прерванных заданий импорта: {requeued}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Не удалось возобновить прерванные задания: {e}")
+
+    def _claim_next_job(self):
+        """Атомарно переводит первое задание из очереди в статус running"""
+        job = ImportJob.query.filter_by(status='queued').order_by(ImportJob.id).first()
+        if not job:
+            return None
+
+        now = datetime.utcnow()
+        claimed = ImportJob.query.filter_by(id=job.id, status='queued').update({
+            'status': 'running',
+            'started_at': now,
+            'claimed_by': self.worker_id,
+            'heartbeat_at': now
+        })
+        db.session.commit()
+
+        if not claimed:
+            return None
+
+        db.session.refresh(job)
+        return job
+
+    def _run_next_job(self):
+        job = self._claim_next_job()
+        if not job:
+            return False
+
+        print(f"▶️  Начато задание импорта #{job.id}")
+        try:
+            # Обработчик может вернуть итоговый статус (например, paused)
+            job.status = self.runner(job) or 'finished'
+        except Exception as e:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error_message = str(e)
+            print(f"❌ Задание импорта #{job.id} завершилось с ошибкой: {e}")
+            traceback.print_exc()
+
+        if job.status != 'paused':
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        print(f"⏹️  Задание импорта #{job.id}: {job.status}")
+        return True
+
+
+def pause_requested(job):
+    """Проверка, запросил ли пользователь паузу (значение читается из базы, а не из сессии)"""
+    status = db.session.query(ImportJob.status).filter_by(id=job.id).scalar()
+    return status == 'pausing'
@@ -0,0 +1,111 @@
+# importer.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Токен-бакет: не более rate запросов в секунду с запасом burst"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Ожидание свободного токена (блокирует вызывающий поток)"""
+        if not self.rate:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class HostRateLimiter:
+    """Ограничение частоты запросов отдельно для каждого хоста"""
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def configure(self, rate=None, burst=1):
+        """Новые лимиты: rate - запросов в секунду на хост (None - без ограничения)"""
+        with self.lock:
+            self.rate = rate
+            self.burst = burst
+            self.buckets = {}
+
+    def wait(self, url):
+        """Ожидание разрешения на запрос к хосту из url"""
+        host = urlparse(url).netloc
+
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self.buckets[host] = bucket
+
+        bucket.acquire()
+
+
+# Общий ограничитель для всех исходящих запросов к источникам
+rate_limiter = HostRateLimiter()
+
+
+class ConcurrentImporter:
+    """Параллельная загрузка и парсинг танцев по списку ID"""
+
+    def __init__(self, fetch_func, max_workers=4):
+        self.fetch_func = fetch_func
+        self.max_workers = max(1, max_workers)
+
+    def run(self, dance_ids):
+        """
+        Запускает fetch_func для каждого ID в пуле потоков
+
+        Одновременно в работе не больше 2 * max_workers задач, поэтому
+        длинные диапазоны не создают тысячи отложенных задач.
+
+        Yields:
+            tuple: (dance_id, результат fetch_func, исключение или None)
+                   в порядке завершения
+        """
+        dance_ids = iter(dance_ids)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dance-import')
+        in_flight = {}
+
+        def submit_next():
+            for dance_id in dance_ids:
+                in_flight[executor.submit(self.fetch_func, dance_id)] = dance_id
+                return True
+            return False
+
+        try:
+            while len(in_flight) < self.max_workers * 2 and submit_next():
+                pass
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dance_id = in_flight.pop(future)
+                    error = future.exception()
+                    yield dance_id, (None if error else future.result()), error
+                    submit_next()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
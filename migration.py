@@ -1,38 +1,175 @@
 # migration.py
-from app import app, db
-from models import Dance
+import os
+os.environ.setdefault('IMPORT_WORKER_AUTOSTART', '0')  # скрипт не выполняет задания импорта
+
+from app import app, db, page_cache, parse_cache, apply_page_fields, apply_formation_index
+from dance_store import LookupCache
+from fulltext import setup_fulltext_index
+from models import Dance, DanceFigure, ImportJob
+from parsers import DancePageParser, extract_dance_id_from_url
+from sqlalchemy import inspect, and_, or_
+
+# Столбцы, добавленные в модели после создания таблиц: имя -> SQL-тип
+NEW_COLUMNS = {
+    Dance: [
+        ('set_format', 'INTEGER'),
+        ('couples_count', 'INTEGER'),
+        ('source_etag', 'VARCHAR(255)'),
+        ('source_last_modified', 'VARCHAR(64)'),
+        ('source_hash', 'VARCHAR(64)'),
+        ('source_checked_at', 'TIMESTAMP'),
+        ('source_id', 'INTEGER'),
+        ('meter', 'VARCHAR(20)'),
+        ('bars', 'VARCHAR(10)'),
+        ('progression', 'VARCHAR(50)'),
+        ('year', 'INTEGER'),
+        ('intensity', 'INTEGER'),
+        ('steps', 'TEXT'),
+        ('recommended_music', 'TEXT'),
+        ('figures', 'TEXT'),
+        ('formations_list', 'TEXT'),
+    ],
+    DanceFigure: [
+        ('figure_id', 'INTEGER'),
+    ],
+    ImportJob: [
+        ('checkpoint_id', 'INTEGER'),
+        ('timings', 'TEXT'),
+        ('claimed_by', 'VARCHAR(100)'),
+        ('heartbeat_at', 'TIMESTAMP'),
+    ],
+}
 
 def add_new_columns():
-    """Добавление новых столбцов в таблицу dance"""
+    """Добавление новых столбцов в существующие таблицы"""
     with app.app_context():
         try:
-            # Для PostgreSQL
-            if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+            # Недостающие таблицы (например, import_job_chunk) создаются целиком
+            db.create_all()
+            inspector = inspect(db.engine)
+            
+            for model, columns in NEW_COLUMNS.items():
+                table = model.__table__
+                existing_columns = {
+                    column['name'] for column in inspector.get_columns(table.name, schema=table.schema)
+                }
+                
+                added_columns = []
                 with db.engine.connect() as conn:
                     # Добавляем столбцы если их нет
-                    conn.execute(db.text("""
-                        DO $$ 
-                        BEGIN 
-                            IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                                        WHERE table_schema = 'scddb' 
-                                        AND table_name = 'dance' 
-                                        AND column_name = 'set_format') THEN
-                                ALTER TABLE scddb.dance ADD COLUMN set_format INTEGER;
-                            END IF;
-                            
-                            IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                                        WHERE table_schema = 'scddb' 
-                                        AND table_name = 'dance' 
-                                        AND column_name = 'couples_count') THEN
-                                ALTER TABLE scddb.dance ADD COLUMN couples_count INTEGER;
-                            END IF;
-                        END $$;
-                    """))
+                    for column_name, column_type in columns:
+                        if column_name not in existing_columns:
+                            conn.execute(db.text(f"ALTER TABLE {table.fullname} ADD COLUMN {column_name} {column_type}"))
+                            added_columns.append(column_name)
+                    
+                    # Индексы, объявленные в модели (например, dance.source_id)
+                    for index in table.indexes:
+                        index.create(bind=conn, checkfirst=True)
                     conn.commit()
-                print("✅ Столбцы set_format и couples_count добавлены в таблицу dance")
+                
+                if added_columns:
+                    print(f"✅ Столбцы {', '.join(added_columns)} добавлены в таблицу {table.name}")
+                else:
+                    print(f"✅ Все столбцы таблицы {table.name} уже существуют")
             
         except Exception as e:
             print(f"❌ Ошибка при добавлении столбцов: {e}")
 
+def backfill_source_ids():
+    """Заполнение source_id для танцев, импортированных до появления столбца"""
+    with app.app_context():
+        try:
+            rows = db.session.query(Dance.id, Dance.source_url).filter(
+                Dance.source_id.is_(None), Dance.source_url.like('%/dance/%')
+            ).all()
+            
+            updates = []
+            for dance_id, source_url in rows:
+                source_id = extract_dance_id_from_url(source_url)
+                if source_id:
+                    updates.append({'id': dance_id, 'source_id': int(source_id)})
+            
+            if updates:
+                db.session.execute(db.update(Dance), updates)
+                db.session.commit()
+            print(f"✅ source_id заполнен для {len(updates)} танцев")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Ошибка при заполнении source_id: {e}")
+
+def backfill_page_fields(batch_size=500):
+    """
+    Заполнение meter, year, steps, figures и других полей страницы у танцев,
+    импортированных до появления этих столбцов
+    
+    Данные берутся из кэша разбора (по source_hash) или разбором страницы
+    из кэша страниц - без повторной загрузки с сайта.
+    """
+    with app.app_context():
+        try:
+            dances = Dance.query.filter(
+                Dance.source_url.like('%/dance/%'),
+                Dance.meter.is_(None), Dance.year.is_(None),
+                Dance.steps.is_(None), Dance.figures.is_(None)
+            ).all()
+            
+            lookups = LookupCache()
+            filled = 0
+            not_cached = 0
+            for dance in dances:
+                dance_data = parse_cache.get(dance.source_hash) if dance.source_hash else None
+                if dance_data is None:
+                    content = page_cache.get(dance.source_url, allow_stale=True)
+                    if content is None:
+                        not_cached += 1
+                        continue
+                    dance_data = DancePageParser(content).parse_dance_data()
+                
+                apply_page_fields(dance, dance_data, lookups)
+                filled += 1
+                if filled % batch_size == 0:
+                    db.session.commit()
+            
+            db.session.commit()
+            print(f"✅ Поля страницы заполнены для {filled} танцев (страниц нет в кэше: {not_cached})")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Ошибка при заполнении полей страницы: {e}")
+
+def backfill_formation_index(batch_size=500):
+    """
+    Таблицы формаций и фигур для танцев, у которых списки сохранены только в JSON-столбцах,
+    и ссылки на справочник фигур для строк dance_figure, записанных до его появления
+    """
+    with app.app_context():
+        try:
+            dances = Dance.query.filter(
+                or_(Dance.formations_list.isnot(None), Dance.figures.isnot(None)),
+                or_(
+                    and_(~Dance.formations.any(), ~Dance.figure_rows.any()),
+                    Dance.figure_rows.any(DanceFigure.figure_id.is_(None))
+                )
+            ).all()
+            
+            lookups = LookupCache()
+            for count, dance in enumerate(dances, start=1):
+                apply_formation_index(dance, dance.get_formations_list(), dance.get_figures(), lookups)
+                if count % batch_size == 0:
+                    db.session.commit()
+            
+            db.session.commit()
+            print(f"✅ Формации и фигуры записаны для {len(dances)} танцев")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Ошибка при заполнении формаций и фигур: {e}")
+
 if __name__ == '__main__':
-    add_new_columns()
\ No newline at end of file
+    add_new_columns()
+    with app.app_context():
+        setup_fulltext_index()
+    backfill_source_ids()
+    backfill_page_fields()
+    backfill_formation_index()
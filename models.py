@@ -1,5 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import validates
 from datetime import datetime
+import json
+import re
 
 db = SQLAlchemy()
 
@@ -56,6 +59,28 @@ class DanceType(BaseModel):
     code = db.Column(db.String(1), nullable=False, unique=True)
     description = db.Column(db.Text)
 
+# Модель для справочника формаций (фигур): Poussette, Reel of three...
+class Formation(BaseModel):
+    __tablename__ = 'formation'
+    __table_args__ = {'schema': 'scddb'}
+    
+    name = db.Column(db.String(255), nullable=False, unique=True)
+
+# Модель для справочника фигур по тактам (текст фигуры из E-cribs): 2s and 3s set, Rights and lefts...
+class Figure(BaseModel):
+    __tablename__ = 'figure'
+    __table_args__ = {'schema': 'scddb'}
+    
+    name = db.Column(db.String(255), nullable=False, unique=True)
+
+# Связь танец - формация (поиск танцев с формацией идет по индексу formation_id)
+dance_formation = db.Table(
+    'dance_formation',
+    db.Column('dance_id', db.Integer, db.ForeignKey('scddb.dance.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('formation_id', db.Integer, db.ForeignKey('scddb.formation.id', ondelete='CASCADE'), primary_key=True, index=True),
+    schema='scddb'
+)
+
 #########################################################
 # Модель данных для танцев
 class Dance(db.Model):
@@ -79,11 +104,30 @@ class Dance(db.Model):
     published = db.Column(db.String(255))
     note = db.Column(db.Text)  # ИЗМЕНЕНО: String(10000) -> Text
     source_url = db.Column(db.String(500))
+    source_id = db.Column(db.Integer, index=True)  # ID танца на my.strathspey.org (из source_url)
+    # Валидаторы страницы-источника для условного обновления (If-None-Match / If-Modified-Since)
+    source_etag = db.Column(db.String(255))
+    source_last_modified = db.Column(db.String(64))
+    source_hash = db.Column(db.String(64))  # SHA-256 последней разобранной версии страницы
+    source_checked_at = db.Column(db.DateTime)
+    # Данные страницы-источника, не входящие в основные поля танца
+    meter = db.Column(db.String(20), index=True)  # музыкальный размер: 4/4L, 3/4
+    bars = db.Column(db.String(10))  # код тактов: R32, J48
+    progression = db.Column(db.String(50))  # прогрессия: 213, 2341
+    year = db.Column(db.Integer, index=True)  # год создания танца
+    intensity = db.Column(db.Integer, index=True)  # интенсивность, %
+    steps = db.Column(db.Text)  # шаги, JSON-список
+    recommended_music = db.Column(db.Text)  # рекомендованная музыка, JSON-список
+    figures = db.Column(db.Text)  # фигуры по тактам, JSON-список {bars, description}
+    formations_list = db.Column(db.Text)  # формации, JSON-список
 
     # Связи
     set_type = db.relationship('SetType', backref='dances')
     dance_format = db.relationship('DanceFormat', backref='dances')
     dance_type = db.relationship('DanceType', backref='dances')
+    formations = db.relationship('Formation', secondary=dance_formation, order_by='Formation.name', backref='dances')
+    figure_rows = db.relationship('DanceFigure', backref='dance', order_by='DanceFigure.position',
+                                  cascade='all, delete-orphan')
     
     @classmethod
     def get_by_id(cls, id):
@@ -91,4 +135,127 @@ class Dance(db.Model):
     
     @classmethod
     def get_all(cls):
-        return cls.query.order_by(cls.name).all()
\ No newline at end of file
+        return cls.query.order_by(cls.name).all()
+    
+    def get_steps(self):
+        return json.loads(self.steps) if self.steps else []
+    
+    def get_recommended_music(self):
+        return json.loads(self.recommended_music) if self.recommended_music else []
+    
+    def get_figures(self):
+        return json.loads(self.figures) if self.figures else []
+    
+    def get_formations_list(self):
+        return json.loads(self.formations_list) if self.formations_list else []
+    
+    @validates('source_url')
+    def validate_source_url(self, key, source_url):
+        """source_id заполняется при каждом изменении source_url"""
+        match = re.search(r'/dance/(\d+)/', source_url or '')
+        self.source_id = int(match.group(1)) if match else None
+        return source_url
+
+# Фигура танца по тактам (из E-cribs страницы-источника; поиск танцев с фигурой идет по индексу figure_id)
+class DanceFigure(db.Model):
+    __tablename__ = 'dance_figure'
+    __table_args__ = {'schema': 'scddb'}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    dance_id = db.Column(db.Integer, db.ForeignKey('scddb.dance.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)  # порядковый номер фигуры в танце
+    bars = db.Column(db.String(20))  # такты: 1-8, 9-16
+    figure_id = db.Column(db.Integer, db.ForeignKey('scddb.figure.id'), index=True)
+    
+    figure = db.relationship('Figure')
+    
+    @property
+    def description(self):
+        return self.figure.name if self.figure else None
+
+#########################################################
+# Модель фонового задания импорта
+class ImportJob(db.Model):
+    __tablename__ = 'import_job'
+    __table_args__ = {'schema': 'scddb'}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='range')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, pausing, paused, finished, failed
+    params = db.Column(db.Text)  # параметры импорта в JSON
+    total = db.Column(db.Integer, default=0)  # сколько ID нужно обработать
+    processed = db.Column(db.Integer, default=0)
+    successful = db.Column(db.Integer, default=0)
+    skipped = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    details = db.Column(db.Text)  # результаты по каждому ID в JSON
+    checkpoint_id = db.Column(db.Integer)  # последний ID, до которого диапазон обработан полностью
+    timings = db.Column(db.Text)  # p50/p95 длительности этапов импорта в JSON
+    claimed_by = db.Column(db.String(100))  # обработчик, выполняющий задание: хост:pid
+    heartbeat_at = db.Column(db.DateTime)  # последнее сохранение прогресса владельцем задания
+    error_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+    
+    def get_details(self):
+        return json.loads(self.details) if self.details else []
+    
+    def get_timings(self):
+        return json.loads(self.timings) if self.timings else {}
+    
+    chunks = db.relationship('ImportJobChunk', backref='job', order_by='ImportJobChunk.start_id',
+                             cascade='all, delete-orphan')
+    
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running', 'pausing')
+    
+    def to_progress(self):
+        """Состояние задания для JSON-эндпоинта прогресса"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'total': self.total or 0,
+            'processed': self.processed or 0,
+            'successful': self.successful or 0,
+            'skipped': self.skipped or 0,
+            'errors': self.errors or 0,
+            'error_message': self.error_message,
+            'checkpoint_id': self.checkpoint_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def to_results(self):
+        """Результаты в формате шаблона batch_import.html"""
+        return {
+            'total': self.processed or 0,
+            'successful': self.successful or 0,
+            'skipped': self.skipped or 0,
+            'errors': self.errors or 0,
+            'details': self.get_details(),
+            'timings': self.get_timings()
+        }
+
+
+# Часть диапазона задания импорта - единица контрольной точки
+class ImportJobChunk(db.Model):
+    __tablename__ = 'import_job_chunk'
+    __table_args__ = {'schema': 'scddb'}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('scddb.import_job.id'), nullable=False, index=True)
+    start_id = db.Column(db.Integer, nullable=False)
+    end_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done
+    processed = db.Column(db.Integer, default=0)
+    successful = db.Column(db.Integer, default=0)
+    skipped = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    finished_at = db.Column(db.DateTime)
@@ -0,0 +1,223 @@
+# page_cache.py
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class PageCache:
+    """
+    Локальный сжатый кэш загруженных страниц
+
+    Содержимое хранится по SHA-256 (objects/ab/abcd....gz), индекс URL -> хеш,
+    время загрузки и последнего обращения - в index.sqlite рядом.
+    Записи старше ttl считаются устаревшими, при превышении max_bytes
+    удаляются давно не использованные (LRU).
+    """
+
+    # Записей, читаемых из индекса за один запрос при вытеснении
+    EVICT_BATCH = 64
+
+    def __init__(self, folder, ttl=7 * 24 * 3600, max_bytes=512 * 1024 * 1024):
+        self.folder = folder
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._conn = None
+        self._size = None  # Текущий размер объектов в байтах (считается из индекса один раз)
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.join(self.folder, 'objects'), exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.folder, 'index.sqlite'), check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+            # Индексы, созданные до появления валидаторов, дополняем столбцами
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE pages ADD COLUMN {column} TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)")
+            self._conn.commit()
+        return self._conn
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.folder, 'objects', content_hash[:2], f"{content_hash}.gz")
+
+    def get_entry(self, url):
+        """Метаданные записи: content_hash, size, fetched_at, accessed_at, etag, last_modified (или None)"""
+        with self.lock:
+            row = self._connection().execute(
+                "SELECT content_hash, size, fetched_at, accessed_at, etag, last_modified FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'content_hash': row[0],
+            'size': row[1],
+            'fetched_at': row[2],
+            'accessed_at': row[3],
+            'etag': row[4],
+            'last_modified': row[5]
+        }
+
+    def get(self, url, allow_stale=False):
+        """Содержимое страницы из кэша или None (устаревшие - только при allow_stale)"""
+        entry = self.get_entry(url)
+        if not entry:
+            return None
+
+        if not allow_stale and self.ttl and time.time() - entry['fetched_at'] > self.ttl:
+            return None
+
+        try:
+            with gzip.open(self._object_path(entry['content_hash']), 'rb') as f:
+                content = f.read()
+        except (OSError, EOFError):
+            # Файл удален или поврежден - забываем запись
+            self.delete(url)
+            return None
+
+        with self.lock:
+            conn = self._connection()
+            conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+        return content
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Сохранение страницы с валидаторами ответа (ETag, Last-Modified); возвращает SHA-256 содержимого"""
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(content_hash)
+
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, object_path)
+
+        size = os.path.getsize(object_path)
+        now = time.time()
+        with self.lock:
+            conn = self._connection()
+            self._current_size()
+            old = conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            is_new_object = not conn.execute(
+                "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, content_hash, size, fetched_at, accessed_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, size, now, now, etag, last_modified)
+            )
+            conn.commit()
+            if is_new_object:
+                self._size += size
+            if old and old[0] != content_hash:
+                self._size -= self._remove_object_if_unused(old[0])
+            overflow = self.max_bytes and self._size > self.max_bytes
+
+        if overflow:
+            self.evict()
+        return content_hash
+
+    def touch(self, url):
+        """Отметить запись как свежую (страница не изменилась на сервере)"""
+        with self.lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            conn.commit()
+
+    def delete(self, url):
+        with self.lock:
+            conn = self._connection()
+            row = conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            conn.commit()
+            if row:
+                freed = self._remove_object_if_unused(row[0])
+                if self._size is not None:
+                    self._size -= freed
+
+    def _remove_object_if_unused(self, content_hash):
+        """Удаление файла содержимого, на который больше нет ссылок; возвращает освобожденные байты"""
+        used = self._connection().execute(
+            "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)
+        ).fetchone()
+        if used:
+            return 0
+        object_path = self._object_path(content_hash)
+        try:
+            size = os.path.getsize(object_path)
+            os.remove(object_path)
+        except OSError:
+            return 0
+        return size
+
+    def total_size(self):
+        with self.lock:
+            return self._current_size()
+
+    def _current_size(self):
+        """Размер кэша по счетчику; полный подсчет по индексу - только при первом обращении"""
+        if self._size is None:
+            self._size = self._total_size()
+        return self._size
+
+    def _total_size(self):
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM pages)"
+        ).fetchone()
+        return row[0]
+
+    def evict(self):
+        """Удаление давно не использованных записей, пока кэш больше max_bytes"""
+        if not self.max_bytes:
+            return 0
+
+        removed = 0
+        with self.lock:
+            conn = self._connection()
+            total = self._current_size()
+            if total <= self.max_bytes:
+                return 0
+
+            # Старейшие записи читаются страницами по индексу accessed_at, пока кэш не уложится в лимит
+            while total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT url, content_hash FROM pages ORDER BY accessed_at LIMIT ?", (self.EVICT_BATCH,)
+                ).fetchall()
+                if not rows:
+                    break
+                for url, content_hash in rows:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    total -= self._remove_object_if_unused(content_hash)
+                    removed += 1
+            conn.commit()
+            self._size = total
+
+        if removed:
+            print(f"🧹 Кэш страниц: удалено {removed} старых записей")
+        return removed
+
+    def stats(self):
+        with self.lock:
+            count = self._connection().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return {'pages': count, 'bytes': self._current_size(), 'max_bytes': self.max_bytes}
@@ -0,0 +1,94 @@
+# parse_cache.py
+import gzip
+import json
+import os
+import shutil
+import threading
+
+
+class ParseCache:
+    """
+    Дисковый кэш результатов разбора страниц
+
+    Ключ - (SHA-256 содержимого страницы, версия парсера): результат хранится
+    в <folder>/v<версия>/ab/abcd....json.gz. Неизменившаяся страница не
+    разбирается повторно, а при смене PARSER_VERSION старые записи просто
+    не находятся; папки прежних версий удаляются при первом обращении.
+    """
+
+    def __init__(self, folder, version):
+        self.folder = folder
+        self.version = str(version)
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'writes': 0}
+        self._pruned = False
+
+    @property
+    def version_folder(self):
+        return os.path.join(self.folder, f"v{self.version}")
+
+    def _entry_path(self, content_hash):
+        return os.path.join(self.version_folder, content_hash[:2], f"{content_hash}.json.gz")
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def get(self, content_hash):
+        """Результат разбора страницы с этим хешем или None"""
+        self.prune_stale_versions()
+        try:
+            with gzip.open(self._entry_path(content_hash), 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except (OSError, EOFError, ValueError):
+            # Поврежденная запись - разбираем страницу заново
+            self.delete(content_hash)
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return data
+
+    def put(self, content_hash, data):
+        """Сохранение результата разбора (атомарно, через временный файл)"""
+        entry_path = self._entry_path(content_hash)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError, ValueError) as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️  Не удалось сохранить результат разбора в кэш: {e}")
+            return
+        self._count('writes')
+
+    def delete(self, content_hash):
+        try:
+            os.remove(self._entry_path(content_hash))
+        except OSError:
+            pass
+
+    def prune_stale_versions(self):
+        """Удаление записей прежних версий парсера (один раз за время работы)"""
+        if self._pruned:
+            return
+        self._pruned = True
+
+        if not os.path.isdir(self.folder):
+            return
+        current = os.path.basename(self.version_folder)
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name != current and name.startswith('v') and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                print(f"🧹 Кэш разбора: удалены записи версии парсера {name[1:]}")
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, version=self.version)
@@ -1,15 +1,228 @@
 # parsers.py
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+from bs4.builder import builder_registry
+import os
 import re
 import requests
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from models import db, Dance, DanceType, DanceFormat, SetType
 
+# Версия результата parse_dance_data: увеличивается при любом изменении разбора,
+# которое меняет извлекаемые данные (записи кэша разбора прежней версии не используются)
+PARSER_VERSION = 1
+
+# Построители дерева BeautifulSoup в порядке предпочтения для backend='auto':
+# lxml в несколько раз быстрее встроенного html.parser
+PARSER_BACKENDS = ['lxml', 'html.parser']
+
+_default_backend = 'auto'
+
+# Частичный разбор: в дерево попадают только разделы страницы, которые читает
+# DancePageParser (см. DanceSectionStrainer)
+_partial_parsing = False
+
+# Подробный вывод хода разбора (по умолчанию выключен: в рабочем режиме
+# парсер не печатает трассировку и не выполняет отладочных обходов дерева)
+_verbose = False
+
+
+def set_default_backend(backend):
+    """Построитель дерева по умолчанию: 'auto' или один из PARSER_BACKENDS"""
+    global _default_backend
+    if backend != 'auto' and backend not in PARSER_BACKENDS:
+        raise ValueError(f"Неизвестный HTML-парсер: {backend}")
+    _default_backend = backend
+
+
+def set_verbose(enabled):
+    """Включение/выключение подробного вывода хода разбора"""
+    global _verbose
+    _verbose = bool(enabled)
+
+
+def is_verbose():
+    return _verbose
+
+
+def set_partial_parsing(enabled):
+    """Включение/выключение частичного разбора страниц по умолчанию"""
+    global _partial_parsing
+    _partial_parsing = bool(enabled)
+
+
+def _trace(message, *args):
+    """Отладочное сообщение парсера; строка форматируется только в подробном режиме"""
+    if _verbose:
+        print(message.format(*args) if args else message)
+
+
+def available_backends():
+    """Установленные построители дерева из PARSER_BACKENDS"""
+    return [backend for backend in PARSER_BACKENDS if builder_registry.lookup(backend)]
+
+
+def build_soup(html_content, backend=None):
+    """
+    Дерево страницы выбранным построителем
+    
+    Если построитель не установлен, используется следующий из PARSER_BACKENDS.
+    
+    Returns:
+        tuple: (BeautifulSoup, имя использованного построителя)
+    """
+    backend = backend or _default_backend
+    if backend == 'auto':
+        candidates = PARSER_BACKENDS
+    else:
+        candidates = [backend] + [candidate for candidate in PARSER_BACKENDS if candidate != backend]
+    
+    last_error = None
+    for candidate in candidates:
+        try:
+            return BeautifulSoup(html_content, candidate), candidate
+        except FeatureNotFound as e:
+            last_error = e
+    raise last_error
+
+
+# Резервный поиск основной информационной строки (когда нет div.lead)
+INFO_KEYWORDS = ['bars', 'couples', 'Longwise', 'Square', 'repetitions']
+INFO_TEXT_MAX_LENGTH = 200      # Длиннее - это уже не строка, а блок текста
+INFO_SCAN_MAX_STRINGS = 5000    # Предел просмотра текстовых узлов на странице
+
+
+def _text_length_reaches(element, limit):
+    """Достигает ли длина текста элемента (без пробелов по краям) limit - без сборки всего текста"""
+    text = ''
+    for string in element.strings:
+        text += string
+        if len(text.strip()) >= limit:
+            return True
+    return False
+
+
+def _attr_values(attrs, name):
+    """Значения атрибута тега до построения дерева (строка или список - в зависимости от версии bs4)"""
+    value = attrs.get(name) if attrs else None
+    if not value:
+        return []
+    return value.split() if isinstance(value, str) else list(value)
+
+
+class DanceSectionStrainer(SoupStrainer):
+    """
+    Фильтр для parse_only: строятся только поддеревья, которые читает DancePageParser
+    
+    h1, div.lead, все dl, div#cribs, div#extrainfo, div.cribtext, span#title,
+    link rel=canonical, meta og:url и первый p после h1. Навигация, скрипты
+    и подвал страницы в дерево не попадают.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.after_h1 = False
+    
+    def keep_tag(self, name, attrs):
+        if name in ('h1', 'dl'):
+            self.after_h1 = self.after_h1 or name == 'h1'
+            return True
+        if name == 'p':
+            # Первый p после h1 - строка с кодом тактов и прогрессией
+            if self.after_h1:
+                self.after_h1 = False
+                return True
+            return False
+        if name == 'div':
+            return (attrs.get('id') in ('cribs', 'extrainfo')
+                    or bool({'lead', 'cribtext'} & set(_attr_values(attrs, 'class'))))
+        if name == 'span':
+            return attrs.get('id') == 'title'
+        if name == 'link':
+            return 'canonical' in _attr_values(attrs, 'rel')
+        if name == 'meta':
+            return attrs.get('property') == 'og:url'
+        return False
+    
+    # bs4 >= 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.keep_tag(name, attrs or {})
+    
+    def allow_string_creation(self, string):
+        return False
+    
+    # bs4 < 4.13
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, str):
+            return self.keep_tag(markup_name, markup_attrs or {})
+        return super().search_tag(markup_name, markup_attrs)
+
+
+def build_section_soup(html_content, backend=None):
+    """
+    Частичное дерево страницы (только разделы DanceSectionStrainer)
+    
+    Если на странице нет div.lead или h1, строится полное дерево: резервные
+    способы поиска основной информационной строки просматривают всю страницу.
+    
+    Returns:
+        tuple: (BeautifulSoup, имя построителя, True если дерево частичное)
+    """
+    backend = backend or _default_backend
+    candidates = PARSER_BACKENDS if backend == 'auto' else [backend]
+    # html5lib не поддерживает parse_only
+    candidates = [candidate for candidate in candidates if candidate in PARSER_BACKENDS]
+    
+    for candidate in candidates:
+        try:
+            soup = BeautifulSoup(html_content, candidate, parse_only=DanceSectionStrainer())
+        except FeatureNotFound:
+            continue
+        if soup.find('div', class_='lead') and soup.find('h1'):
+            return soup, candidate, True
+        break
+    
+    soup, backend = build_soup(html_content, backend)
+    return soup, backend, False
+
 
 class DancePageParser:
     """Парсер страницы с информацией о танце"""
     
-    def __init__(self, html_content):
-        self.soup = BeautifulSoup(html_content, 'html.parser')
+    def __init__(self, html_content, backend=None, partial=None):
+        if _partial_parsing if partial is None else partial:
+            self.soup, self.backend, self.partial = build_section_soup(html_content, backend)
+        else:
+            self.soup, self.backend = build_soup(html_content, backend)
+            self.partial = False
+        self._definitions = None
+    
+    def _get_definitions(self):
+        """
+        Строки метаданных страницы (dt -> dd), собранные за один проход по дереву
+        
+        Returns:
+            list: кортежи (текст dt, текст dt в нижнем регистре, dd) в порядке документа
+        """
+        if self._definitions is None:
+            self._definitions = []
+            for dt in self.soup.find_all('dt', class_='col-sm-2 text-sm-end'):
+                dd = dt.find_next_sibling('dd')
+                if dd:
+                    label = dt.get_text()
+                    self._definitions.append((label, label.lower(), dd))
+        return self._definitions
+    
+    def _find_definitions(self, label, ignore_case=False):
+        """Все dd, в подписи которых встречается label (в порядке документа)"""
+        if ignore_case:
+            label = label.lower()
+            return [dd for _, label_lower, dd in self._get_definitions() if label in label_lower]
+        return [dd for dt_text, _, dd in self._get_definitions() if label in dt_text]
+    
+    def _find_definition(self, label):
+        """Первый dd, в подписи которого встречается label (или None)"""
+        definitions = self._find_definitions(label)
+        return definitions[0] if definitions else None
     
     def parse_dance_data(self):
         """Основной метод парсинга данных о танце"""
@@ -50,10 +263,11 @@ class DancePageParser:
         data['size'] = self._format_size(data.get('repetitions'), data.get('bars_count'))
         
         # Отладочная информация
-        print("🎯 ФИНАЛЬНЫЙ РЕЗУЛЬТАТ ПАРСИНГА:")
-        for key in ['name', 'dance_type', 'size', 'meter', 'bars_count', 'repetitions', 'couples_count', 'set_format', 'formation']:
-            print(f"   {key}: {data[key]}")
-        print("---")
+        if _verbose:
+            _trace("🎯 ФИНАЛЬНЫЙ РЕЗУЛЬТАТ ПАРСИНГА:")
+            for key in ['name', 'dance_type', 'size', 'meter', 'bars_count', 'repetitions', 'couples_count', 'set_format', 'formation']:
+                _trace("   {}: {}", key, data[key])
+            _trace("---")
         
         return data
     
@@ -74,13 +288,13 @@ class DancePageParser:
             'repetitions': None
         }
         
-        print("🔍 Начинаем поиск основной информационной строки...")
+        _trace("🔍 Начинаем поиск основной информационной строки...")
         
         # СПОСОБ 1: Ищем основной информационный блок с классом lead
         lead_div = self.soup.find('div', class_='lead')
         if lead_div:
             text = lead_div.get_text().strip()
-            print(f"✅ Найден div.lead: '{text}'")
+            _trace("✅ Найден div.lead: '{}'", text)
             return self._analyze_info_text(text, result)
         
         # СПОСОБ 2: Ищем после заголовка h1
@@ -91,44 +305,68 @@ class DancePageParser:
             if next_elem:
                 text = next_elem.get_text().strip()
                 if any(keyword in text for keyword in ['bars', 'couples', 'Longwise', 'Square', 'Reel', 'Jig']):
-                    print(f"✅ Найден элемент после h1: '{text}'")
+                    _trace("✅ Найден элемент после h1: '{}'", text)
                     return self._analyze_info_text(text, result)
         
         # СПОСОБ 3: Ищем любой элемент с ключевыми словами
-        elements = self.soup.find_all(['div', 'p', 'span'])
-        for elem in elements:
-            text = elem.get_text().strip()
-            if (any(keyword in text for keyword in ['bars', 'couples', 'Longwise', 'Square', 'repetitions']) and 
-                len(text) < 200):  # Ограничиваем длину чтобы не брать большие тексты
-                print(f"✅ Найден подходящий элемент: '{text}'")
-                return self._analyze_info_text(text, result)
-        
-        print("❌ Основная информационная строка не найдена")
+        text = self._scan_info_text()
+        if text:
+            _trace("✅ Найден подходящий элемент: '{}'", text)
+            return self._analyze_info_text(text, result)
+        
+        _trace("❌ Основная информационная строка не найдена")
         return result
 
+    def _scan_info_text(self):
+        """
+        Резервный поиск основной строки: первый в порядке документа div/p/span
+        с ключевым словом и текстом короче INFO_TEXT_MAX_LENGTH символов
+        
+        Просматриваются текстовые узлы (не более INFO_SCAN_MAX_STRINGS), для узла
+        с ключевым словом берется самый внешний подходящий предок. Длина текста
+        предка считается с ранним выходом, поэтому большие вложенные блоки
+        не перечитываются целиком для каждого элемента.
+        """
+        for scanned, string in enumerate(self.soup.strings):
+            if scanned >= INFO_SCAN_MAX_STRINGS:
+                _trace("⚠️  Достигнут предел просмотра текстовых узлов: {}", INFO_SCAN_MAX_STRINGS)
+                break
+            if not any(keyword in string for keyword in INFO_KEYWORDS):
+                continue
+            
+            candidate = None
+            for parent in string.parents:
+                if _text_length_reaches(parent, INFO_TEXT_MAX_LENGTH):
+                    break  # у предков текст только длиннее
+                if parent.name in ('div', 'p', 'span'):
+                    candidate = parent
+            if candidate is not None:
+                return candidate.get_text().strip()
+        return None
+    
     def _analyze_info_text(self, text, result):
         """Анализ текста информационной строки"""
-        print(f"🎯 Анализируем строку: '{text}'")
+        _trace("🎯 Анализируем строку: '{}'", text)
         
         # 1. Ищем тип танца (Reel, Jig, etc) - в начале строки
         dance_types = ['Reel', 'Jig', 'Strathspey', 'March', 'Waltz', 'Polka', 'Hornpipe', 'Medley']
         for dance_type in dance_types:
             if dance_type in text:
                 result['dance_type'] = dance_type
-                print(f"✅ Найдено dance_type: {dance_type}")
+                _trace("✅ Найдено dance_type: {}", dance_type)
                 break
         
         # 2. Ищем количество тактов (32 bars)
         bars_match = re.search(r'(\d+)\s*bars?', text, re.IGNORECASE)
         if bars_match:
             result['bars_count'] = int(bars_match.group(1))
-            print(f"✅ Найдено bars_count: {result['bars_count']}")
+            _trace("✅ Найдено bars_count: {}", result['bars_count'])
         
         # 3. Ищем количество пар (3 couples)
         couples_match = re.search(r'(\d+)\s+couples?', text, re.IGNORECASE)
         if couples_match:
             result['couples_count'] = int(couples_match.group(1))
-            print(f"✅ Найдено couples_count: {result['couples_count']}")
+            _trace("✅ Найдено couples_count: {}", result['couples_count'])
         
         # 4. Ищем формацию и формат сета (Longwise - 4)
         # Сначала ищем полный формат "Longwise - 4"
@@ -146,7 +384,7 @@ class DancePageParser:
             
             result['formation'] = formation_mapping.get(formation_name, 'Longwise set')
             result['set_format'] = set_format
-            print(f"✅ Найдено formation: {result['formation']}, set_format: {result['set_format']}")
+            _trace("✅ Найдено formation: {}, set_format: {}", result['formation'], result['set_format'])
         else:
             # Если не нашли с форматом, ищем просто формацию
             for formation in ['Longwise', 'Square', 'Triangular', 'Circular']:
@@ -158,7 +396,7 @@ class DancePageParser:
                         'Circular': 'Circular set'
                     }
                     result['formation'] = formation_mapping.get(formation, 'Longwise set')
-                    print(f"✅ Найдено formation (без формата): {result['formation']}")
+                    _trace("✅ Найдено formation (без формата): {}", result['formation'])
                     break
         
         # 5. Ищем количество повторений (Usual number of repetitions: 8)
@@ -174,13 +412,13 @@ class DancePageParser:
             rep_match = re.search(pattern, text, re.IGNORECASE)
             if rep_match:
                 result['repetitions'] = int(rep_match.group(1))
-                print(f"✅ Найдено repetitions: {result['repetitions']}")
+                _trace("✅ Найдено repetitions: {}", result['repetitions'])
                 break
         
         # 6. Если нашли формацию но не нашли set_format, используем couples_count
         if result['formation'] and not result['set_format'] and result['couples_count']:
             result['set_format'] = result['couples_count']
-            print(f"⚠️  set_format не найден, используем couples_count: {result['set_format']}")
+            _trace("⚠️  set_format не найден, используем couples_count: {}", result['set_format'])
         
         return result
 
@@ -207,16 +445,12 @@ class DancePageParser:
     
     def _parse_dance_type_fallback(self):
         """Резервный метод парсинга типа танца"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Dance' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    dance_text = dd.get_text().strip()
-                    dance_types = ['Reel', 'Jig', 'Strathspey', 'March', 'Waltz', 'Polka']
-                    for dance_type in dance_types:
-                        if dance_type in dance_text:
-                            return dance_type
+        for dd in self._find_definitions('Dance'):
+            dance_text = dd.get_text().strip()
+            dance_types = ['Reel', 'Jig', 'Strathspey', 'March', 'Waltz', 'Polka']
+            for dance_type in dance_types:
+                if dance_type in dance_text:
+                    return dance_type
         return 'Unknown'
     
     def _parse_meter(self):
@@ -229,14 +463,11 @@ class DancePageParser:
                 return meter_match.group(1)
         
         # Ищем в структурированных данных
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Meter' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    meter_text = dd.get_text().strip()
-                    meter_match = re.search(r'(\d+/\d+[A-Z]*)', meter_text)
-                    return meter_match.group(1) if meter_match else meter_text
+        dd = self._find_definition('Meter')
+        if dd:
+            meter_text = dd.get_text().strip()
+            meter_match = re.search(r'(\d+/\d+[A-Z]*)', meter_text)
+            return meter_match.group(1) if meter_match else meter_text
         return None
     
     def _parse_bars(self):
@@ -271,34 +502,26 @@ class DancePageParser:
     
     def _parse_formation_fallback(self):
         """Резервный метод парсинга формации"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Formation' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    formation_text = dd.get_text().strip()
-                    formation_mapping = {
-                        'Longwise': 'Longwise set',
-                        'Square': 'Square set', 
-                        'Triangular': 'Triangular set',
-                        'Circular': 'Circular set'
-                    }
-                    for key in formation_mapping:
-                        if key in formation_text:
-                            return formation_mapping[key]
+        for dd in self._find_definitions('Formation'):
+            formation_text = dd.get_text().strip()
+            formation_mapping = {
+                'Longwise': 'Longwise set',
+                'Square': 'Square set', 
+                'Triangular': 'Triangular set',
+                'Circular': 'Circular set'
+            }
+            for key in formation_mapping:
+                if key in formation_text:
+                    return formation_mapping[key]
         return 'Longwise set'
     
     def _parse_couples_count_fallback(self):
         """Резервный метод парсинга количества пар"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Couples' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    couples_text = dd.get_text().strip()
-                    couples_match = re.search(r'(\d+)', couples_text)
-                    if couples_match:
-                        return int(couples_match.group(1))
+        for dd in self._find_definitions('Couples'):
+            couples_text = dd.get_text().strip()
+            couples_match = re.search(r'(\d+)', couples_text)
+            if couples_match:
+                return int(couples_match.group(1))
         return 4
     
     def _parse_progression(self):
@@ -329,63 +552,53 @@ class DancePageParser:
                 rep_match = re.search(pattern, text, re.IGNORECASE)
                 if rep_match:
                     repetitions = int(rep_match.group(1))
-                    print(f"✅ Найдено repetitions в основной строке: {repetitions}")
+                    _trace("✅ Найдено repetitions в основной строке: {}", repetitions)
                     return repetitions
         
         # Затем ищем в структурированных данных
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'repetitions' in dt.get_text().lower():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    text = dd.get_text()
-                    rep_match = re.search(r'(\d+)', text)
-                    if rep_match:
-                        repetitions = int(rep_match.group(1))
-                        print(f"✅ Найдено repetitions в структуре: {repetitions}")
-                        return repetitions
-        
-        print("⚠️  Повторения не найдены, используем значение по умолчанию: 4")
+        for dd in self._find_definitions('repetitions', ignore_case=True):
+            text = dd.get_text()
+            rep_match = re.search(r'(\d+)', text)
+            if rep_match:
+                repetitions = int(rep_match.group(1))
+                _trace("✅ Найдено repetitions в структуре: {}", repetitions)
+                return repetitions
+        
+        _trace("⚠️  Повторения не найдены, используем значение по умолчанию: 4")
         return 4  # значение по умолчанию
     
     def _parse_author(self):
         """Парсинг автора"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Devised by' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    author_link = dd.find('a')
-                    return author_link.get_text().strip() if author_link else dd.get_text().strip()
+        dd = self._find_definition('Devised by')
+        if dd:
+            author_link = dd.find('a')
+            return author_link.get_text().strip() if author_link else dd.get_text().strip()
         return 'Unknown'
     
     def _parse_year(self):
         """Парсинг года создания"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Devised by' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    text = dd.get_text()
-                    year_match = re.search(r'\((\d{4})\)', text)
-                    return int(year_match.group(1)) if year_match else None
+        dd = self._find_definition('Devised by')
+        if dd:
+            text = dd.get_text()
+            year_match = re.search(r'\((\d{4})\)', text)
+            return int(year_match.group(1)) if year_match else None
         return None
     
     def _debug_cribs_content(self):
         """Детальная отладка содержимого вкладки Cribs"""
         cribs_tab = self.soup.find('div', {'id': 'cribs'})
         if not cribs_tab:
-            print("❌ Вкладка Cribs не найдена")
+            _trace("❌ Вкладка Cribs не найдена")
             return
         
-        print("🔍 ДЕТАЛЬНАЯ ОТЛАДКА CRIBS:")
+        _trace("🔍 ДЕТАЛЬНАЯ ОТЛАДКА CRIBS:")
         
         # Ищем все карточки
         cards = cribs_tab.find_all('div', class_='card')
-        print(f"📋 Найдено карточек: {len(cards)}")
+        _trace("📋 Найдено карточек: {}", len(cards))
         
         for i, card in enumerate(cards):
-            print(f"\n🎴 КАРТОЧКА {i+1}:")
+            _trace("\n🎴 КАРТОЧКА {}:", i+1)
             
             # Анализируем структуру карточки
             card_header = card.find('div', class_='card-header')
@@ -394,28 +607,28 @@ class DancePageParser:
             
             if card_header:
                 header_text = card_header.get_text().strip()
-                print(f"   📌 Header: {header_text}")
+                _trace("   📌 Header: {}", header_text)
             
             if card_body:
                 body_text = card_body.get_text().strip()
                 preview = body_text[:100] + "..." if len(body_text) > 100 else body_text
-                print(f"   📝 Body: {preview}")
-                print(f"   📏 Длина body: {len(body_text)} символов")
+                _trace("   📝 Body: {}", preview)
+                _trace("   📏 Длина body: {} символов", len(body_text))
             
             if card_footer:
                 footer_text = card_footer.get_text().strip()
-                print(f"   🏷️  Footer: {footer_text}")
+                _trace("   🏷️  Footer: {}", footer_text)
                 
                 # Определяем тип по footer
                 if 'mini' in footer_text.lower():
-                    print("   ⭐ ТИП: MINICRIBS")
+                    _trace("   ⭐ ТИП: MINICRIBS")
                 elif 'e-crib' in footer_text.lower() or 'ecrib' in footer_text.lower():
-                    print("   ⭐ ТИП: E-CRIBS")
+                    _trace("   ⭐ ТИП: E-CRIBS")
                 else:
-                    print("   ❓ ТИП: НЕОПРЕДЕЛЕН")
+                    _trace("   ❓ ТИП: НЕОПРЕДЕЛЕН")
         
         # Также показываем все элементы для полноты информации
-        print(f"\n🔍 Всего элементов в cribs: {len(cribs_tab.find_all(recursive=True))}")
+        _trace("\n🔍 Всего элементов в cribs: {}", len(cribs_tab.find_all(recursive=True)))
 ############################################
 
     def _parse_description(self):
@@ -423,18 +636,19 @@ class DancePageParser:
         description = None
         description2 = None
         
-        print("🔍 Начинаем поиск описаний...")
+        _trace("🔍 Начинаем поиск описаний...")
         
         cribs_tab = self.soup.find('div', {'id': 'cribs'})
         if cribs_tab:
-            print("✅ Найдена вкладка Cribs")
+            _trace("✅ Найдена вкладка Cribs")
             
-            # Детальная отладка структуры
-            self._debug_cribs_content()
+            # Детальная отладка структуры (повторный обход всех карточек - только в подробном режиме)
+            if _verbose:
+                self._debug_cribs_content()
             
             # НОВЫЙ СПОСОБ: Ищем все карточки с описаниями и анализируем их footer
             cards = cribs_tab.find_all('div', class_='card')
-            print(f"🔍 Найдено карточек: {len(cards)}")
+            _trace("🔍 Найдено карточек: {}", len(cards))
             
             found_minicribs = False
             found_ecribs = False
@@ -454,49 +668,51 @@ class DancePageParser:
                 if not description_text:
                     continue
                 
-                print(f"📋 Карточка {i+1}:")
-                print(f"   Footer: '{footer_text}'")
-                print(f"   Длина текста: {len(description_text)} символов")
+                _trace("📋 Карточка {}:", i+1)
+                _trace("   Footer: '{}'", footer_text)
+                _trace("   Длина текста: {} символов", len(description_text))
                 
                 # СТРОГАЯ ПРОВЕРКА: Определяем тип описания ТОЛЬКО по footer
                 footer_lower = footer_text.lower()
                 
                 if 'mini' in footer_lower and 'crib' in footer_lower:
-                    print("   ⭐ ОПРЕДЕЛЕН КАК MINICRIBS (по footer)")
+                    _trace("   ⭐ ОПРЕДЕЛЕН КАК MINICRIBS (по footer)")
                     if not found_minicribs:  # Берем только первый найденный MiniCribs
                         description = description_text
                         found_minicribs = True
-                        preview = description_text[:150] + "..." if len(description_text) > 150 else description_text
-                        print(f"   📝 MiniCribs preview: {preview}")
+                        if _verbose:
+                            preview = description_text[:150] + "..." if len(description_text) > 150 else description_text
+                            _trace("   📝 MiniCribs preview: {}", preview)
                     
                 elif ('e-crib' in footer_lower or 'ecrib' in footer_lower) and 'mini' not in footer_lower:
-                    print("   ⭐ ОПРЕДЕЛЕН КАК E-CRIBS (по footer)")
+                    _trace("   ⭐ ОПРЕДЕЛЕН КАК E-CRIBS (по footer)")
                     if not found_ecribs:  # Берем только первый найденный E-Cribs
                         description2 = description_text
                         found_ecribs = True
-                        preview = description_text[:150] + "..." if len(description_text) > 150 else description_text
-                        print(f"   📝 E-Cribs preview: {preview}")
+                        if _verbose:
+                            preview = description_text[:150] + "..." if len(description_text) > 150 else description_text
+                            _trace("   📝 E-Cribs preview: {}", preview)
                     
                 else:
-                    print("   ❓ Тип не определен по footer - ПРОПУСКАЕМ")
+                    _trace("   ❓ Тип не определен по footer - ПРОПУСКАЕМ")
                     # НЕ используем резервный анализ по содержанию - только строго по footer
                     continue
             
             # ОТЛАДКА: Проверяем что именно нашли
-            print(f"🔍 РЕЗУЛЬТАТЫ ПОСЛЕ АНАЛИЗА КАРТОЧЕК:")
-            print(f"   Найдено MiniCribs: {found_minicribs}")
-            print(f"   Найдено E-Cribs: {found_ecribs}")
+            _trace("🔍 РЕЗУЛЬТАТЫ ПОСЛЕ АНАЛИЗА КАРТОЧЕК:")
+            _trace("   Найдено MiniCribs: {}", found_minicribs)
+            _trace("   Найдено E-Cribs: {}", found_ecribs)
             
             # РЕЗЕРВНЫЙ ПОИСК ТОЛЬКО ЕСЛИ НИЧЕГО НЕ НАШЛИ В КАРТОЧКАХ
             if not found_minicribs and not found_ecribs:
-                print("🔄 Резервный поиск описаний (старая структура)...")
+                _trace("🔄 Резервный поиск описаний (старая структура)...")
                 
                 # Поиск E-Cribs
                 e_cribs = cribs_tab.find('div', class_='cribtext')
                 if e_cribs:
                     description2_text = self._clean_cribs_text(e_cribs.get_text())
                     if description2_text:
-                        print("✅ Найден E-Cribs в div.cribtext")
+                        _trace("✅ Найден E-Cribs в div.cribtext")
                         description2 = description2_text
                         found_ecribs = True
                 
@@ -506,33 +722,33 @@ class DancePageParser:
                     if mini_cribs:
                         description_text = self._clean_minicribs_text(mini_cribs.get_text())
                         if description_text:
-                            print("✅ Найден MiniCribs в div.minicribs")
+                            _trace("✅ Найден MiniCribs в div.minicribs")
                             description = description_text
                             found_minicribs = True
             
             # ФИНАЛЬНАЯ ОЧИСТКА: Удаляем поля, которые не должны быть заполнены
             if not found_minicribs:
-                print("🗑️  MiniCribs не найден - очищаем поле")
+                _trace("🗑️  MiniCribs не найден - очищаем поле")
                 description = None
             
             if not found_ecribs:
-                print("🗑️  E-Cribs не найден - очищаем поле") 
+                _trace("🗑️  E-Cribs не найден - очищаем поле")
                 description2 = None
         
         # Финальные результаты с четким указанием что найдено
-        print("📊 ФИНАЛЬНЫЕ РЕЗУЛЬТАТЫ ПОИСКА ОПИСАНИЙ:")
-        print(f"   MiniCribs: {'✅ НАЙДЕНО' if description else '❌ НЕ НАЙДЕНО'}")
-        print(f"   E-Cribs: {'✅ НАЙДЕНО' if description2 else '❌ НЕ НАЙДЕНО'}")
+        _trace("📊 ФИНАЛЬНЫЕ РЕЗУЛЬТАТЫ ПОИСКА ОПИСАНИЙ:")
+        _trace("   MiniCribs: {}", '✅ НАЙДЕНО' if description else '❌ НЕ НАЙДЕНО')
+        _trace("   E-Cribs: {}", '✅ НАЙДЕНО' if description2 else '❌ НЕ НАЙДЕНО')
         
         # ПРАВИЛА ЗАПОЛНЕНИЯ:
         if description and not description2:
-            print("📝 РЕЖИМ: Только MiniCribs")
+            _trace("📝 РЕЖИМ: Только MiniCribs")
         elif description2 and not description:
-            print("📝 РЕЖИМ: Только E-Cribs")  
+            _trace("📝 РЕЖИМ: Только E-Cribs")
         elif description and description2:
-            print("📝 РЕЖИМ: Оба описания")
+            _trace("📝 РЕЖИМ: Оба описания")
         else:
-            print("📝 РЕЖИМ: Описания не найдены")
+            _trace("📝 РЕЖИМ: Описания не найдены")
         
         return {
             'description': description,
@@ -632,39 +848,28 @@ class DancePageParser:
     
     def _parse_steps(self):
         """Парсинг шагов"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Steps' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    steps_text = dd.get_text().strip()
-                    return [step.strip() for step in steps_text.split(',')]
+        dd = self._find_definition('Steps')
+        if dd:
+            steps_text = dd.get_text().strip()
+            return [step.strip() for step in steps_text.split(',')]
         return []
     
     def _parse_publications(self):
         """Парсинг публикаций"""
         publications = []
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Published in' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    pub_links = dd.find_all('a')
-                    for link in pub_links:
-                        publications.append(link.get_text().strip())
+        for dd in self._find_definitions('Published in'):
+            pub_links = dd.find_all('a')
+            for link in pub_links:
+                publications.append(link.get_text().strip())
         return publications
     
     def _parse_music(self):
         """Парсинг рекомендованной музыки"""
         music = []
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Recommended Music' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    music_links = dd.find_all('a')
-                    for link in music_links:
-                        music.append(link.get_text().strip())
+        for dd in self._find_definitions('Recommended Music'):
+            music_links = dd.find_all('a')
+            for link in music_links:
+                music.append(link.get_text().strip())
         return music
     
     def _parse_figures(self):
@@ -716,34 +921,37 @@ class DancePageParser:
                         return dd.get_text().strip()
         
         return ""
-    
+
+    def get_extrainfo_text(self):
+        """Текст вкладки #extrainfo из уже построенного дерева страницы (без повторной загрузки)"""
+        extrainfo_section = self.soup.find('div', id='extrainfo')
+
+        if not extrainfo_section:
+            return ""
+
+        # Извлекаем текст из раздела, очищаем от лишних пробелов
+        return extrainfo_section.get_text(separator='\n', strip=True)
+
     def _parse_intensity(self):
         """Парсинг интенсивности танца"""
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Intensity' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    intensity_text = dd.get_text().strip()
-                    intensity_match = re.search(r'(\d+%)', intensity_text)
-                    if intensity_match:
-                        return intensity_match.group(1)
-                    return intensity_text
+        dd = self._find_definition('Intensity')
+        if dd:
+            intensity_text = dd.get_text().strip()
+            intensity_match = re.search(r'(\d+%)', intensity_text)
+            if intensity_match:
+                return intensity_match.group(1)
+            return intensity_text
         return None
     
     def _parse_formations_list(self):
         """Парсинг списка формаций"""
         formations = []
-        dt_elements = self.soup.find_all('dt', class_='col-sm-2 text-sm-end')
-        for dt in dt_elements:
-            if 'Formations' in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    formation_links = dd.find_all('a')
-                    for link in formation_links:
-                        formation_name = link.get_text().strip()
-                        if formation_name and formation_name not in formations:
-                            formations.append(formation_name)
+        for dd in self._find_definitions('Formations'):
+            formation_links = dd.find_all('a')
+            for link in formation_links:
+                formation_name = link.get_text().strip()
+                if formation_name and formation_name not in formations:
+                    formations.append(formation_name)
         return formations
     
     def _parse_source_url(self):
@@ -764,13 +972,13 @@ class DancePageParser:
         
         cribs_tab = self.soup.find('div', {'id': 'cribs'})
         if not cribs_tab:
-            print("❌ Вкладка Cribs не найдена")
+            _trace("❌ Вкладка Cribs не найдена")
             return images
         
-        print("✅ Найдена вкладка Cribs")
+        _trace("✅ Найдена вкладка Cribs")
         
         img_elements = cribs_tab.find_all('img')
-        print(f"🔍 Найдено тегов img: {len(img_elements)}")
+        _trace("🔍 Найдено тегов img: {}", len(img_elements))
         
         for img in img_elements:
             src = img.get('src')
@@ -785,7 +993,7 @@ class DancePageParser:
                     'filename': self._extract_filename(src),
                     'type': image_type
                 })
-                print(f"🖼️  Найдено изображение ({image_type}): {full_url}")
+                _trace("🖼️  Найдено изображение ({}): {}", image_type, full_url)
         
         svg_objects = cribs_tab.find_all('object', {'type': 'image/svg+xml'})
         for svg_obj in svg_objects:
@@ -798,7 +1006,7 @@ class DancePageParser:
                     'filename': self._extract_filename(data),
                     'type': 'diagram'
                 })
-                print(f"🖼️  Найден SVG: {full_url}")
+                _trace("🖼️  Найден SVG: {}", full_url)
         
         image_links = cribs_tab.find_all('a', href=re.compile(r'\.(png|jpg|jpeg|gif|svg|webp)', re.I))
         for link in image_links:
@@ -814,9 +1022,9 @@ class DancePageParser:
                     'filename': self._extract_filename(href),
                     'type': image_type
                 })
-                print(f"🖼️  Найдена ссылка на изображение ({image_type}): {full_url}")
+                _trace("🖼️  Найдена ссылка на изображение ({}): {}", image_type, full_url)
         
-        print(f"📊 Итого изображений: {len(images)}")
+        _trace("📊 Итого изображений: {}", len(images))
         return images
 
     def _determine_image_type(self, url, alt_text):
@@ -869,22 +1077,109 @@ class DancePageParser:
         return filename
 
 
+def _init_parse_worker(backend, partial, verbose):
+    """Настройки парсера в дочернем процессе (глобальные переменные модуля не наследуются при spawn)"""
+    set_default_backend(backend)
+    set_partial_parsing(partial)
+    set_verbose(verbose)
+
+
+def _parse_page(html_content, include_note=False):
+    """Данные танца со страницы; include_note - текст #extrainfo в поле note (как при импорте)"""
+    parser = DancePageParser(html_content)
+    dance_data = parser.parse_dance_data()
+    if include_note:
+        dance_data['note'] = parser.get_extrainfo_text()
+    return dance_data
+
+
+def _parse_page_in_worker(index, html_content, include_note=False):
+    """
+    Разбор одной страницы в дочернем процессе
+    
+    Returns:
+        tuple: (номер страницы, данные танца или None, текст ошибки или None)
+    """
+    try:
+        return index, _parse_page(html_content, include_note), None
+    except Exception as e:
+        # Ошибка передается строкой: не всякое исключение переживет pickle
+        return index, None, str(e)
+
+
 class BatchDanceParser:
     """Класс для пакетной обработки нескольких танцев"""
     
-    def __init__(self):
+    def __init__(self, processes=1, include_note=False):
+        """
+        Args:
+            processes: число процессов разбора (1 - в текущем процессе, None - по числу ядер)
+            include_note: добавлять текст #extrainfo в поле note
+        """
         self.parsed_dances = []
         self.errors = []
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.include_note = include_note
     
-    def parse_multiple_dances(self, html_contents):
-        """Парсинг нескольких HTML страниц"""
+    def iter_dances(self, html_contents):
+        """
+        Потоковый разбор страниц из любого итерируемого источника (список, генератор, архив)
+        
+        Результаты отдаются по одному и не накапливаются, поэтому память
+        не растет с числом страниц. В одном процессе порядок совпадает
+        с порядком страниц, в пуле процессов - порядок завершения разбора.
+        
+        Yields:
+            tuple: (номер страницы, данные танца или None, текст ошибки или None)
+        """
+        if self.processes > 1:
+            yield from self.iter_parallel(html_contents)
+            return
+        
         for i, html_content in enumerate(html_contents):
             try:
-                parser = DancePageParser(html_content)
-                dance_data = parser.parse_dance_data()
-                self.parsed_dances.append(dance_data)
+                result = i, _parse_page(html_content, self.include_note), None
             except Exception as e:
-                self.errors.append(f"Ошибка при парсинге танца {i+1}: {str(e)}")
+                result = i, None, str(e)
+            yield result
+    
+    def iter_parallel(self, html_contents):
+        """
+        Разбор страниц в пуле из self.processes процессов
+        
+        Страницы берутся из html_contents по мере освобождения процессов:
+        в работе одновременно не больше двух страниц на процесс.
+        
+        Yields:
+            tuple: (номер страницы, данные танца или None, текст ошибки или None)
+                   в порядке завершения разбора
+        """
+        initargs = (_default_backend, _partial_parsing, _verbose)
+        max_pending = self.processes * 2
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_parse_worker, initargs=initargs) as executor:
+            pending = set()
+            for i, html_content in enumerate(html_contents):
+                pending.add(executor.submit(_parse_page_in_worker, i, html_content, self.include_note))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            
+            for future in as_completed(pending):
+                yield future.result()
+    
+    def parse_multiple_dances(self, html_contents):
+        """Парсинг нескольких HTML страниц (все результаты собираются в памяти, см. iter_dances)"""
+        results = self.iter_dances(html_contents)
+        if self.processes > 1:
+            # Результаты собираются в порядке страниц, как при разборе в одном процессе
+            results = sorted(results, key=lambda result: result[0])
+        
+        for i, dance_data, error in results:
+            if error is None:
+                self.parsed_dances.append(dance_data)
+            else:
+                self.errors.append(f"Ошибка при парсинге танца {i+1}: {error}")
         
         return {
             'successful': self.parsed_dances,
@@ -894,6 +1189,26 @@ class BatchDanceParser:
         }
 
 
+def compare_backends(html_content, backends=None):
+    """
+    Проверка совпадения результатов parse_dance_data на разных построителях дерева
+    
+    Returns:
+        dict: поле -> {построитель: значение} для различающихся полей
+              (пустой словарь - все поля совпали)
+    """
+    backends = backends or available_backends()
+    results = {backend: DancePageParser(html_content, backend=backend).parse_dance_data() for backend in backends}
+    
+    differences = {}
+    fields = set().union(*(data.keys() for data in results.values()))
+    for field in sorted(fields):
+        values = {backend: data.get(field) for backend, data in results.items()}
+        if len({repr(value) for value in values.values()}) > 1:
+            differences[field] = values
+    return differences
+
+
 def extract_dance_id_from_url(url):
     """Извлечение ID танца из URL"""
     if not url:
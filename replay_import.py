@@ -0,0 +1,167 @@
+# replay_import.py
+"""
+Импорт танцев из сохраненных страниц без обращения к сети
+
+Страницы берутся из папки или архива (.zip, .tar, .tar.gz, .tgz, .tar.bz2),
+имя файла содержит ID танца на my.strathspey.org: 1234.html, dance_1234.htm, 1234.html.gz.
+
+    python replay_import.py pages.tar.gz
+    python replay_import.py saved_pages/ --batch-size 200 --no-skip-existing
+    python replay_import.py pages.zip --processes 4
+"""
+import argparse
+import gzip
+import hashlib
+import itertools
+import os
+import re
+import sys
+import tarfile
+import time
+import zipfile
+
+os.environ.setdefault('IMPORT_WORKER_AUTOSTART', '0')  # скрипт не выполняет задания импорта
+
+from app import app, apply_dance_data, load_existing_source_ids
+from dance_store import DanceBatchWriter
+from parsers import BatchDanceParser, set_verbose
+
+PAGE_NAME_PATTERN = re.compile(r'(\d+)\.html?(\.gz)?$', re.IGNORECASE)
+
+
+def dance_id_from_filename(filename):
+    """ID танца из имени файла страницы (None для посторонних файлов)"""
+    match = PAGE_NAME_PATTERN.search(os.path.basename(filename))
+    return int(match.group(1)) if match else None
+
+
+def _decompress(filename, content):
+    return gzip.decompress(content) if filename.lower().endswith('.gz') else content
+
+
+def iter_saved_pages(path):
+    """
+    Страницы из папки или архива по одной (архив не распаковывается целиком)
+
+    Yields:
+        tuple: (ID танца, содержимое страницы в байтах)
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                dance_id = dance_id_from_filename(filename)
+                if dance_id is None:
+                    continue
+                with open(os.path.join(root, filename), 'rb') as f:
+                    yield dance_id, _decompress(filename, f.read())
+
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                dance_id = dance_id_from_filename(info.filename)
+                if info.is_dir() or dance_id is None:
+                    continue
+                yield dance_id, _decompress(info.filename, archive.read(info))
+
+    elif tarfile.is_tarfile(path):
+        # Потоковый режим: члены архива читаются последовательно
+        with tarfile.open(path, 'r|*') as archive:
+            for member in archive:
+                dance_id = dance_id_from_filename(member.name)
+                if not member.isfile() or dance_id is None:
+                    continue
+                yield dance_id, _decompress(member.name, archive.extractfile(member).read())
+
+    else:
+        raise ValueError(f"Не папка и не архив zip/tar: {path}")
+
+
+def replay_import(path, skip_existing=True, batch_size=None, processes=1):
+    """
+    Разбор сохраненных страниц и сохранение танцев в базу
+    
+    Страницы читаются, разбираются (processes > 1 - в пуле процессов)
+    и передаются в DanceBatchWriter потоком, без накопления в памяти.
+
+    Returns:
+        dict: счетчики total, successful, skipped, errors
+    """
+    results = {'total': 0, 'successful': 0, 'skipped': 0, 'errors': 0}
+    started_at = time.perf_counter()
+
+    with app.app_context():
+        existing_ids = load_existing_source_ids() if skip_existing else set()
+        writer = DanceBatchWriter(apply_dance_data, batch_size=batch_size or app.config['IMPORT_DB_BATCH_SIZE'])
+        batch_parser = BatchDanceParser(processes=processes, include_note=True)
+
+        # Номер страницы в потоке разбора -> (ID танца, хеш страницы), только для страниц в работе
+        in_progress = {}
+
+        def pages_to_parse():
+            numbers = itertools.count()
+            for dance_id, content in iter_saved_pages(path):
+                results['total'] += 1
+
+                if dance_id in existing_ids:
+                    results['skipped'] += 1
+                    continue
+
+                in_progress[next(numbers)] = (dance_id, hashlib.sha256(content).hexdigest())
+                yield content
+
+                if results['total'] % 500 == 0:
+                    print(f"📄 Обработано страниц: {results['total']}")
+
+        def on_saved(dance, error, dance_id):
+            if error:
+                results['errors'] += 1
+                print(f"❌ Ошибка БД для ID {dance_id}: {error}")
+            else:
+                results['successful'] += 1
+                existing_ids.add(dance_id)
+
+        for number, dance_data, error in batch_parser.iter_dances(pages_to_parse()):
+            dance_id, content_hash = in_progress.pop(number)
+
+            if error:
+                print(f"❌ Ошибка парсинга страницы {dance_id}: {error}")
+            if not dance_data or not dance_data.get('name'):
+                results['errors'] += 1
+                continue
+
+            dance_data['note'] = dance_data.get('note') or ""
+            dance_data['source_url'] = f'https://my.strathspey.org/dd/dance/{dance_id}/'
+            dance_data['source_etag'] = None
+            dance_data['source_last_modified'] = None
+            dance_data['source_hash'] = content_hash
+
+            writer.add(dance_data, lambda dance, error, dance_id=dance_id: on_saved(dance, error, dance_id))
+
+        writer.flush()
+
+    elapsed = time.perf_counter() - started_at
+    print(f"✅ Импорт из {path} завершен за {elapsed:.1f} с. "
+          f"Всего: {results['total']}, Успешно: {results['successful']}, "
+          f"Пропущено: {results['skipped']}, Ошибки: {results['errors']}")
+    print(f"💾 Запись в базу: {writer.stats}")
+    return results
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Импорт танцев из сохраненных страниц my.strathspey.org')
+    arg_parser.add_argument('path', help='папка или архив (.zip, .tar, .tar.gz) со страницами <ID>.html')
+    arg_parser.add_argument('--no-skip-existing', action='store_true', help='импортировать и уже существующие танцы')
+    arg_parser.add_argument('--batch-size', type=int, default=None, help='танцев в одной транзакции')
+    arg_parser.add_argument('--processes', type=int, default=1, help='процессов разбора страниц (0 - по числу ядер)')
+    arg_parser.add_argument('--verbose', action='store_true', help='подробный вывод хода разбора страниц')
+    args = arg_parser.parse_args()
+
+    if args.verbose:
+        set_verbose(True)
+
+    if not os.path.exists(args.path):
+        print(f"❌ Путь не найден: {args.path}")
+        sys.exit(1)
+
+    replay_import(args.path, skip_existing=not args.no_skip_existing, batch_size=args.batch_size,
+                  processes=args.processes or None)
@@ -0,0 +1,85 @@
+# db_support.py
+"""
+Приложение на временной базе SQLite для тестов
+
+Таблицы моделей объявлены в схеме scddb, поэтому к каждому соединению
+подключается (ATTACH) отдельный файл базы под этим именем.
+Если зависимости приложения не установлены, тесты пропускаются.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_FOLDER)
+
+TEMP_FOLDER = tempfile.mkdtemp(prefix='scddb-tests-')
+atexit.register(shutil.rmtree, TEMP_FOLDER, ignore_errors=True)
+SCHEMA_FILE = os.path.join(TEMP_FOLDER, 'scddb.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEMP_FOLDER, 'main.db')}"
+os.environ['IMPORT_WORKER_AUTOSTART'] = '0'
+
+try:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import app as app_module
+    import fulltext
+except ImportError as e:
+    raise unittest.SkipTest(f"Зависимости приложения не установлены: {e}")
+
+from models import db
+
+
+@event.listens_for(Engine, 'connect')
+def _attach_schema(dbapi_connection, connection_record):
+    if 'sqlite' in type(dbapi_connection).__module__:
+        dbapi_connection.execute(f"ATTACH DATABASE '{SCHEMA_FILE}' AS scddb")
+
+
+app = app_module.app
+app.config['TESTING'] = True
+app.config['IMPORT_TIMINGS_LOG'] = os.path.join(TEMP_FOLDER, 'logs', 'import_timings.jsonl')
+app.config['UPLOAD_FOLDER'] = os.path.join(TEMP_FOLDER, 'dance_files')
+
+
+def reset_database():
+    """Пустые таблицы (полнотекстовый индекс удаляется: его создают тесты, которым он нужен)"""
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(db.text("DROP TABLE IF EXISTS scddb.dance_fts"))
+    db.drop_all()
+    db.create_all()
+    fulltext._available = None
+
+
+class AppTestCase(unittest.TestCase):
+    """Тест внутри контекста приложения на чистой базе"""
+
+    def setUp(self):
+        self.app_context = app.app_context()
+        self.app_context.push()
+        reset_database()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        self.app_context.pop()
+
+    def save_dance(self, name, **dance_data):
+        """Танец из словаря в формате DancePageParser (как при импорте)"""
+        dance = app_module.Dance()
+        app_module.apply_dance_data(dance, dict(dance_data, name=name))
+        db.session.add(dance)
+        db.session.commit()
+        return dance
+
+    def search(self, **params):
+        """Имена танцев, найденных /search (из тех, что сохранены в тесте)"""
+        response = self.client.get('/search', query_string=dict(params, search_submitted='true'))
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        names = [name for name, in db.session.query(app_module.Dance.name).order_by(app_module.Dance.name)]
+        return [name for name in names if name in body]
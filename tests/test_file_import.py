@@ -0,0 +1,93 @@
+# test_file_import.py
+"""
+Сопоставление столбцов CSV/XLSX с полями танца и чтение файла частями
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_import import iter_file_chunks, map_row, resolve_columns, sniff_csv_format
+
+
+class ResolveColumnsTest(unittest.TestCase):
+
+    def test_aliases_ignore_case_and_spaces(self):
+        self.assertEqual(
+            resolve_columns([' Title ', 'DEVISOR', 'Количество пар', 'E-cribs', 'Ссылка']),
+            {' Title ': 'name', 'DEVISOR': 'author', 'Количество пар': 'couples_count',
+             'E-cribs': 'description2', 'Ссылка': 'source_url'}
+        )
+
+    def test_unknown_and_empty_headers_are_skipped(self):
+        self.assertEqual(resolve_columns(['name', 'comment', None, '']), {'name': 'name'})
+
+    def test_first_column_wins_for_duplicate_field(self):
+        self.assertEqual(resolve_columns(['Name', 'title', 'dance']), {'Name': 'name'})
+
+
+class MapRowTest(unittest.TestCase):
+
+    def test_values_are_cleaned_and_converted(self):
+        column_map = resolve_columns(['name', 'bars', 'couples', 'year', 'published', 'note'])
+        row = {
+            'name': '  The Reel  ',
+            'bars': '32.0',
+            'couples': 3.0,
+            'year': 'around 1990',
+            'published': 'Book 1, , Book 2',
+            'note': '   ',
+        }
+        self.assertEqual(map_row(row, column_map), {
+            'name': 'The Reel',
+            'bars_count': 32,
+            'couples_count': 3,
+            'published_in': ['Book 1', 'Book 2'],
+        })
+
+    def test_missing_and_nan_values_are_dropped(self):
+        column_map = resolve_columns(['name', 'author', 'meter'])
+        self.assertEqual(map_row({'name': 'Jig', 'author': float('nan')}, column_map), {'name': 'Jig'})
+
+
+class IterFileChunksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='file-import-')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def write(self, filename, text, encoding='utf-8'):
+        path = os.path.join(self.folder, filename)
+        with open(path, 'w', encoding=encoding, newline='') as f:
+            f.write(text)
+        return path
+
+    def test_semicolon_csv_is_read_in_chunks(self):
+        lines = ['name;author;bars'] + [f'Dance {number};Author, Jr;32' for number in range(5)]
+        path = self.write('dances.csv', '\n'.join(lines) + '\n')
+
+        self.assertEqual(sniff_csv_format(path), ('utf-8', ';'))
+        chunks = list(iter_file_chunks(path, chunk_size=2))
+        self.assertEqual([len(rows) for _, rows in chunks], [2, 2, 1])
+        self.assertEqual(chunks[0][0], ['name', 'author', 'bars'])
+        self.assertEqual(chunks[2][1], [{'name': 'Dance 4', 'author': 'Author, Jr', 'bars': '32'}])
+
+    def test_bom_and_quoted_commas(self):
+        path = self.write('dances.csv', 'name,author\n"Reel, The",Иванов\n', encoding='utf-8-sig')
+        self.assertEqual(sniff_csv_format(path), ('utf-8-sig', ','))
+        self.assertEqual(list(iter_file_chunks(path))[0][1], [{'name': 'Reel, The', 'author': 'Иванов'}])
+
+    def test_single_column_falls_back_to_comma(self):
+        path = self.write('names.csv', 'name\nJig\n')
+        self.assertEqual(sniff_csv_format(path)[1], ',')
+        self.assertEqual(list(iter_file_chunks(path))[0][1], [{'name': 'Jig'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
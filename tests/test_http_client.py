@@ -0,0 +1,79 @@
+# test_http_client.py
+"""
+Счетчики соединений HttpClient против локального HTTP-сервера
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import HttpClient
+
+
+class PageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = b'<html></html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    """Сервер, считающий принятые TCP-подключения"""
+    daemon_threads = True
+
+    def __init__(self, protocol_version):
+        handler = type('Handler', (PageHandler,), {'protocol_version': protocol_version})
+        super().__init__(('127.0.0.1', 0), handler)
+        self.accepted = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.accepted += 1
+        return request
+
+
+class ConnectionStatsTest(unittest.TestCase):
+
+    def serve(self, protocol_version):
+        server = CountingServer(protocol_version)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def fetch(self, url, count):
+        client = HttpClient(pool_size=1, max_retries=0)
+        self.addCleanup(client.close)
+        for _ in range(count):
+            response = client.get(url)
+            response.content
+        return client.stats()
+
+    def test_keep_alive_connection_is_reused(self):
+        server, url = self.serve('HTTP/1.1')
+        stats = self.fetch(url, 5)
+        self.assertEqual(server.accepted, 1)
+        self.assertEqual((stats['new_connections'], stats['reused_connections']), (1, 4))
+
+    def test_reconnects_are_counted_as_new_connections(self):
+        # HTTP/1.0: сервер закрывает соединение после каждого ответа
+        server, url = self.serve('HTTP/1.0')
+        stats = self.fetch(url, 5)
+        self.assertEqual(server.accepted, 5)
+        self.assertEqual((stats['new_connections'], stats['reused_connections']), (5, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
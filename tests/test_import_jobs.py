@@ -0,0 +1,72 @@
+# test_import_jobs.py
+"""
+Возобновление прерванных заданий импорта (ImportJobWorker)
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from db_support import AppTestCase, app, db
+from import_jobs import ImportJobWorker, JobProgress
+from models import ImportJob
+
+
+class OtherWorker(ImportJobWorker):
+    worker_id = 'other-host:2'
+
+
+class RequeueInterruptedJobsTest(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.worker = ImportJobWorker(app, runner=lambda job: None, stale_after=60)
+
+    def add_job(self, status, claimed_by='other-host:1', heartbeat_age=None):
+        heartbeat_at = datetime.utcnow() - timedelta(seconds=heartbeat_age) if heartbeat_age is not None else None
+        job = ImportJob(status=status, claimed_by=claimed_by, heartbeat_at=heartbeat_at)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    def status(self, job_id):
+        return db.session.query(ImportJob.status).filter_by(id=job_id).scalar()
+
+    def test_job_of_live_worker_is_left_running(self):
+        job_id = self.add_job('running', heartbeat_age=5)
+        pausing_id = self.add_job('pausing', heartbeat_age=5)
+        self.worker._requeue_interrupted_jobs()
+        self.assertEqual(self.status(job_id), 'running')
+        self.assertEqual(self.status(pausing_id), 'pausing')
+
+    def test_stale_jobs_are_requeued(self):
+        stale_id = self.add_job('running', heartbeat_age=600)
+        legacy_id = self.add_job('running', claimed_by=None)
+        pausing_id = self.add_job('pausing', heartbeat_age=600)
+        self.worker._requeue_interrupted_jobs()
+        self.assertEqual(self.status(stale_id), 'queued')
+        self.assertEqual(self.status(legacy_id), 'queued')
+        self.assertEqual(self.status(pausing_id), 'paused')
+
+    def test_job_of_this_process_is_requeued(self):
+        job_id = self.add_job('running', claimed_by=self.worker.worker_id, heartbeat_age=5)
+        self.worker._requeue_interrupted_jobs()
+        self.assertEqual(self.status(job_id), 'queued')
+
+    def test_claim_records_owner_and_progress_updates_heartbeat(self):
+        job_id = self.add_job('queued', claimed_by=None)
+        job = self.worker._claim_next_job()
+        self.assertEqual((job.id, job.status, job.claimed_by), (job_id, 'running', self.worker.worker_id))
+
+        job.heartbeat_at = datetime.utcnow() - timedelta(seconds=600)
+        db.session.commit()
+        JobProgress(job).save(force=True)
+
+        # Другой процесс видит свежую отметку и задание не забирает
+        OtherWorker(app, runner=lambda job: None, stale_after=60)._requeue_interrupted_jobs()
+        self.assertEqual(self.status(job_id), 'running')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# test_page_cache.py
+"""
+Вытеснение записей PageCache при превышении max_bytes
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_cache import PageCache
+
+
+class EvictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix='page-cache-')
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def page(self, number):
+        # Несжимаемое содержимое: размер объекта на диске ~ размеру страницы
+        return os.urandom(1000) + str(number).encode()
+
+    def test_oldest_pages_are_evicted_until_under_limit(self):
+        cache = PageCache(self.folder, max_bytes=5000)
+        cache.EVICT_BATCH = 2
+        for number in range(20):
+            cache.put(f"https://example.org/{number}", self.page(number))
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 5000)
+        self.assertEqual(stats['bytes'], cache._total_size())
+        self.assertIsNotNone(cache.get("https://example.org/19"))
+        self.assertIsNone(cache.get("https://example.org/0"))
+
+    def test_shared_content_is_counted_once(self):
+        cache = PageCache(self.folder, max_bytes=10 ** 6)
+        content = self.page(1)
+        cache.put("https://example.org/a", content)
+        cache.put("https://example.org/b", content)
+        size = cache.total_size()
+
+        cache.delete("https://example.org/a")
+        self.assertEqual(cache.total_size(), size)
+        cache.delete("https://example.org/b")
+        self.assertEqual(cache.total_size(), 0)
+        self.assertEqual(cache._total_size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+# test_parser_backends.py
+"""
+Совпадение результатов DancePageParser на lxml и html.parser
+для страниц из benchmarks/corpus
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import glob
+import os
+import sys
+import unittest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_FOLDER)
+
+import parsers
+from parsers import compare_backends
+
+CORPUS_PAGES = sorted(glob.glob(os.path.join(ROOT_FOLDER, 'benchmarks', 'corpus', '*.html')))
+
+
+@unittest.skipUnless('lxml' in parsers.available_backends(), 'lxml не установлен')
+class CompareBackendsTest(unittest.TestCase):
+
+    def setUp(self):
+        parsers.set_verbose(False)
+
+    def test_corpus_is_not_empty(self):
+        self.assertTrue(CORPUS_PAGES, 'В benchmarks/corpus нет страниц .html')
+
+    def test_backends_agree_on_corpus(self):
+        for page_path in CORPUS_PAGES:
+            with self.subTest(page=os.path.basename(page_path)):
+                with open(page_path, encoding='utf-8') as f:
+                    html_content = f.read()
+                self.assertEqual(compare_backends(html_content, parsers.PARSER_BACKENDS), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
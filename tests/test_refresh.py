@@ -0,0 +1,95 @@
+# test_refresh.py
+"""
+Запись результатов условного обновления танцев (apply_refresh_result)
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime
+
+import requests
+
+from db_support import AppTestCase, db
+from app import apply_refresh_result
+from dance_store import LookupCache
+from models import Dance
+
+SOURCE_URL = 'https://my.strathspey.org/dd/dance/42/'
+
+
+class ApplyRefreshResultTest(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        dance = self.save_dance(
+            'Old Name',
+            source_url=SOURCE_URL, source_etag='"v1"', source_last_modified='Mon, 01 Jan 2024 00:00:00 GMT',
+            source_hash='a' * 64, note='Extra info\n\n📷 Загружено изображений: 1'
+        )
+        dance.source_checked_at = datetime(2024, 1, 1)
+        db.session.commit()
+        self.dance_id = dance.id
+        self.results = {'total': 0, 'successful': 0, 'skipped': 0, 'errors': 0, 'details': []}
+
+    def apply(self, outcome, error=None):
+        apply_refresh_result(self.dance_id, SOURCE_URL, outcome, error, self.results, LookupCache())
+        db.session.expire_all()
+        return db.session.get(Dance, self.dance_id)
+
+    def counters(self):
+        return self.results['successful'], self.results['skipped'], self.results['errors']
+
+    def page(self, etag='"v2"'):
+        return {'content': b'', 'content_hash': 'b' * 64, 'etag': etag, 'last_modified': None}
+
+    def test_not_modified_only_marks_check_time(self):
+        dance = self.apply({'status': 'not_modified'})
+
+        self.assertEqual(self.counters(), (0, 1, 0))
+        self.assertEqual(self.results['details'][0]['message'], 'Страница не изменилась (304)')
+        self.assertEqual(dance.source_etag, '"v1"')
+        self.assertGreater(dance.source_checked_at, datetime(2024, 1, 1))
+
+    def test_unchanged_content_updates_validators(self):
+        dance = self.apply({'status': 'unchanged', 'page': self.page()})
+
+        self.assertEqual(self.counters(), (0, 1, 0))
+        self.assertEqual(dance.source_etag, '"v2"')
+        self.assertEqual(dance.source_last_modified, 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+    def test_changed_page_updates_dance_and_keeps_image_list(self):
+        dance_data = {
+            'name': 'New Name', 'note': 'New extra info', 'source_url': SOURCE_URL,
+            'source_etag': '"v2"', 'source_hash': 'b' * 64, 'formations_list': ['Poussette'],
+        }
+        dance = self.apply({'status': 'changed', 'page': self.page(), 'dance_data': dance_data})
+
+        self.assertEqual(self.counters(), (1, 0, 0))
+        self.assertEqual(dance.name, 'New Name')
+        self.assertEqual((dance.source_etag, dance.source_hash), ('"v2"', 'b' * 64))
+        self.assertEqual(dance.note, 'New extra info\n\n📷 Загружено изображений: 1')
+        self.assertEqual([formation.name for formation in dance.formations], ['Poussette'])
+
+    def test_changed_page_that_fails_to_parse_is_an_error(self):
+        for dance_data in (None, {'name': None, 'description': 'crib'}):
+            dance = self.apply({'status': 'changed', 'page': self.page(), 'dance_data': dance_data})
+
+            # Валидаторы прежние: следующее обновление загрузит страницу заново
+            self.assertEqual(dance.name, 'Old Name')
+            self.assertEqual((dance.source_etag, dance.source_hash), ('"v1"', 'a' * 64))
+            self.assertEqual(dance.source_checked_at, datetime(2024, 1, 1))
+
+        self.assertEqual(self.counters(), (0, 0, 2))
+        self.assertEqual(self.results['details'][0]['status'], 'Ошибка')
+
+    def test_network_error(self):
+        dance = self.apply(None, error=requests.ConnectionError('refused'))
+
+        self.assertEqual(self.counters(), (0, 0, 1))
+        self.assertEqual(self.results['details'][0]['status'], 'Ошибка сети')
+        self.assertEqual(dance.source_checked_at, datetime(2024, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
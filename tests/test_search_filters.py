@@ -0,0 +1,119 @@
+# test_search_filters.py
+"""
+Фильтры поиска render_search_results по индексным таблицам
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import unittest
+
+from db_support import AppTestCase, db
+import fulltext
+from models import Dance, Figure, DanceFigure
+
+
+class FigureFilterTest(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.save_dance('Alpha Jig', figures=[
+            {'bars': '1-8', 'description': '1s cross down and  cast'},
+            {'bars': '9-16', 'description': 'Rights and lefts'},
+        ])
+        self.save_dance('Beta Reel', figures=[
+            {'bars': '1-8', 'description': 'Rights and lefts'},
+            {'bars': '9-16', 'description': 'Poussette'},
+        ])
+        self.save_dance('Gamma Strathspey')
+
+    def test_figures_are_stored_once_in_lookup_table(self):
+        self.assertEqual(
+            sorted(name for name, in db.session.query(Figure.name)),
+            ['1s cross down and cast', 'Poussette', 'Rights and lefts']
+        )
+        self.assertEqual(DanceFigure.query.count(), 4)
+        self.assertEqual(DanceFigure.query.filter(DanceFigure.figure_id.is_(None)).count(), 0)
+
+    def test_filter_by_figure(self):
+        self.assertEqual(self.search(figure='rights and lefts'), ['Alpha Jig', 'Beta Reel'])
+        self.assertEqual(self.search(figure='Pouss'), ['Beta Reel'])
+        self.assertEqual(self.search(figure='cross down and cast'), ['Alpha Jig'])
+        self.assertEqual(self.search(figure='allemande'), [])
+
+    def test_filter_combines_with_other_filters(self):
+        self.assertEqual(self.search(figure='rights and lefts', name='Beta'), ['Beta Reel'])
+
+    def test_figure_rows_follow_updated_dance(self):
+        dance = self.save_dance('Delta Medley', figures=[{'bars': '1-8', 'description': 'Poussette'}])
+        from app import apply_dance_data
+        apply_dance_data(dance, {'name': 'Delta Medley', 'figures': [{'bars': '1-8', 'description': 'Allemande'}]})
+        db.session.commit()
+
+        self.assertEqual([row.description for row in dance.figure_rows], ['Allemande'])
+        self.assertEqual(self.search(figure='Allemande'), ['Delta Medley'])
+        self.assertEqual(self.search(figure='Poussette'), ['Beta Reel'])
+
+
+class FormationFilterTest(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.save_dance('Alpha Jig', formations_list=['Poussette', 'Reel of three'])
+        self.save_dance('Beta Reel', formations_list=['Allemande', 'Poussette', 'Poussette '])
+        self.save_dance('Gamma Strathspey', description='Poussette in the cribs only')
+
+    def test_filter_by_formation(self):
+        self.assertEqual(self.search(formation='Poussette'), ['Alpha Jig', 'Beta Reel'])
+        self.assertEqual(self.search(formation='reel of'), ['Alpha Jig'])
+        self.assertEqual(self.search(formation='allem'), ['Beta Reel'])
+        self.assertEqual(self.search(formation='Rondel'), [])
+
+    def test_formation_names_are_stored_once(self):
+        dance = Dance.query.filter_by(name='Beta Reel').one()
+        self.assertEqual([formation.name for formation in dance.formations], ['Allemande', 'Poussette'])
+        self.assertEqual(db.session.query(db.func.count(db.distinct(Dance.id))).filter(Dance.formations.any()).scalar(), 2)
+
+
+class DescriptionTextFilterTest(AppTestCase):
+    """Поиск по тексту описания: начала слов через полнотекстовый индекс, без индекса - подстрока (ilike)"""
+
+    def save_dances(self):
+        self.save_dance('Alpha Jig', description='1s set and cast; Poussette', note='Devised for a wedding')
+        self.save_dance('Beta Reel', description2='Allemande, then rights and lefts')
+        self.save_dance('Gamma Strathspey', description='Reel of three on the sides')
+
+    def test_fulltext_matches_word_prefixes(self):
+        self.assertTrue(fulltext.setup_fulltext_index())
+        self.save_dances()
+
+        self.assertEqual(self.search(description_text='pouss'), ['Alpha Jig'])
+        self.assertEqual(self.search(description_text='Allemande'), ['Beta Reel'])
+        self.assertEqual(self.search(description_text='wedd'), ['Alpha Jig'])
+        # Все слова запроса, в любом из столбцов
+        self.assertEqual(self.search(description_text='cast wedding'), ['Alpha Jig'])
+        self.assertEqual(self.search(description_text='cast allemande'), [])
+        # Середина слова не находится
+        self.assertEqual(self.search(description_text='oussette'), [])
+
+    def test_fulltext_index_follows_updates(self):
+        fulltext.setup_fulltext_index()
+        self.save_dances()
+        dance = Dance.query.filter_by(name='Gamma Strathspey').one()
+        dance.description = 'Double figure of eight'
+        db.session.commit()
+
+        self.assertEqual(self.search(description_text='reel of three'), [])
+        self.assertEqual(self.search(description_text='figure eight'), ['Gamma Strathspey'])
+
+    def test_ilike_fallback_without_index(self):
+        self.save_dances()
+        self.assertFalse(fulltext.fulltext_available())
+        self.assertIsNone(fulltext.fulltext_condition('oussette'))
+
+        self.assertEqual(self.search(description_text='oussette'), ['Alpha Jig'])
+        self.assertEqual(self.search(description_text='rights and lefts'), ['Beta Reel'])
+        self.assertEqual(self.search(description_text='wedding'), ['Alpha Jig'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# timing.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Этапы импорта в порядке отображения
+STAGES = ['fetch', 'parse', 'extrainfo', 'save', 'images']
+
+_local = threading.local()
+
+
+def percentile(values, q):
+    """Перцентиль q (0..1) по ближайшему рангу"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class ImportMetrics:
+    """
+    Длительность этапов импорта и объем загруженных данных по каждому танцу
+
+    Этапы внутри track() отмечаются функциями stage() и add_bytes() этого
+    модуля - в любом потоке, без передачи объекта через все вызовы.
+    """
+
+    def __init__(self, log_path=None, job_id=None):
+        self.log_path = log_path
+        self.job_id = job_id
+        self.records = {}
+        self.samples = {name: [] for name in STAGES + ['bytes']}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def track(self, key):
+        """Все этапы внутри блока записываются на танец key (в текущем потоке)"""
+        previous = getattr(_local, 'current', None)
+        _local.current = (self, key)
+        try:
+            yield
+        finally:
+            _local.current = previous
+
+    def record(self, key, stage_name, seconds):
+        with self.lock:
+            record = self.records.setdefault(key, {})
+            record[stage_name] = record.get(stage_name, 0.0) + seconds
+
+    def add_bytes(self, key, size):
+        with self.lock:
+            record = self.records.setdefault(key, {})
+            record['bytes'] = record.get('bytes', 0) + size
+
+    def flush(self):
+        """
+        Перенос накопленных записей в статистику и в журнал (JSON Lines)
+
+        Вызывается, когда все этапы танцев завершены (например, после части диапазона).
+        """
+        with self.lock:
+            records, self.records = self.records, {}
+
+        for record in records.values():
+            for name, value in record.items():
+                self.samples[name].append(value)
+
+        if self.log_path and records:
+            self._write_log([
+                dict({'job_id': self.job_id, 'dance_id': key}, **{name: _round(value) for name, value in record.items()})
+                for key, record in records.items()
+            ])
+
+    def summary(self):
+        """p50/p95/сумма по каждому этапу (секунды) и по байтам на танец"""
+        summary = {}
+        for name in STAGES + ['bytes']:
+            values = self.samples[name]
+            if not values:
+                continue
+            summary[name] = {
+                'count': len(values),
+                'p50': _round(percentile(values, 0.5)),
+                'p95': _round(percentile(values, 0.95)),
+                'total': _round(sum(values))
+            }
+        return summary
+
+    def write_summary(self):
+        """Запись итоговой строки в журнал"""
+        if self.log_path:
+            self._write_log([{'job_id': self.job_id, 'summary': self.summary()}])
+
+    def _write_log(self, entries):
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(dict({'time': time.strftime('%Y-%m-%dT%H:%M:%S')}, **entry), ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"❌ Не удалось записать журнал времени импорта: {e}")
+
+
+def _round(value):
+    return round(value, 4) if isinstance(value, float) else value
+
+
+@contextmanager
+def stage(name):
+    """Замер этапа name для танца, отслеживаемого в текущем потоке (без track() ничего не делает)"""
+    current = getattr(_local, 'current', None)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        if current:
+            metrics, key = current
+            metrics.record(key, name, time.perf_counter() - started_at)
+
+
+def add_bytes(size):
+    """Учет загруженных байт для танца, отслеживаемого в текущем потоке"""
+    current = getattr(_local, 'current', None)
+    if current and size:
+        metrics, key = current
+        metrics.add_bytes(key, size)